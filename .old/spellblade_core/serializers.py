@@ -1 +0,0 @@
-from rest_framework import serializers
@@ -1,3 +0,0 @@
-from rest_framework.test import APITestCase
-from rest_framework.reverse import reverse
-from rest_framework import status
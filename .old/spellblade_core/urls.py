@@ -1,4 +0,0 @@
-from django.urls import path
-
-urlpatterns = [
-]
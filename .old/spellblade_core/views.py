@@ -1,3 +0,0 @@
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
@@ -0,0 +1,95 @@
+"""
+Gunicorn configuration, picked up by `gunicorn` when run from the repository
+root.
+
+Workers run the ASGI app under uvicorn by default, so the async login view
+awaits password hashing on the event loop instead of holding the worker. For
+plain WSGI, set GUNICORN_APP=spellblade.wsgi:application and
+GUNICORN_WORKER_CLASS=sync or gthread.
+
+The app is preloaded by default. The master imports settings, Django and the
+warmed-up URLconf once, and every worker forks from it sharing that memory
+copy-on-write, so new workers start serving immediately. Module-level state
+that can't be shared, such as thread pools, buffers and the log listener,
+resets itself in forked children.
+
+Each worker writes its metrics to a shared directory, METRICS_DIR, and every
+worker's /metrics/ reports the sum over all of them, so it doesn't matter
+which worker a scrape lands on. Unless METRICS_DIR is set, a fresh temporary
+directory is used and removed when the server exits.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+import environ
+
+env = environ.Env()
+
+wsgi_app = env('GUNICORN_APP', default='spellblade.asgi:application').strip()
+bind = env('GUNICORN_BIND', default='0.0.0.0:8000').strip()
+workers = env.int('GUNICORN_WORKERS', default=os.cpu_count() or 1)
+worker_class = env('GUNICORN_WORKER_CLASS', default='uvicorn.workers.UvicornWorker').strip()
+threads = env.int('GUNICORN_THREADS', default=1)
+timeout = env.int('GUNICORN_TIMEOUT', default=30)
+graceful_timeout = env.int('GUNICORN_GRACEFUL_TIMEOUT', default=30)
+max_requests = env.int('GUNICORN_MAX_REQUESTS', default=0)
+max_requests_jitter = env.int('GUNICORN_MAX_REQUESTS_JITTER', default=0)
+preload_app = env.bool('GUNICORN_PRELOAD', default=True)
+
+metrics_dir = env('METRICS_DIR', default='').strip()
+owns_metrics_dir = not metrics_dir
+
+if owns_metrics_dir:
+    # Set before the app is loaded so that the workers' settings pick it up.
+    metrics_dir = os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='spellblade-metrics-')
+
+def on_starting(server):
+    # Snapshots left by an earlier server would be added to this one's totals.
+    for path in Path(metrics_dir).glob('*.json'):
+        path.unlink()
+
+def on_exit(server):
+    if owns_metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+def pre_fork(server, worker):
+    # Nothing should have connected while preloading, but a socket inherited
+    # by several workers would interleave their queries.
+    if 'django.db' in sys.modules:
+        from django.db import connections
+
+        for connection in connections.all(initialized_only=True):
+            connection.close()
+
+            if hasattr(connection, 'close_pool'):
+                connection.close_pool()
+
+def worker_exit(server, worker):
+    # Write the pending last login timestamps and metrics before the worker
+    # goes away,
+    # rather than relying on atexit running in a process gunicorn forked.
+    if 'spellblade_auth.buffers' in sys.modules:
+        from spellblade_auth.buffers import last_login_buffer
+
+        try:
+            last_login_buffer.flush()
+        except Exception:
+            server.log.exception('Failed to flush last login timestamps')
+
+    if 'spellblade.metrics' in sys.modules:
+        from spellblade.metrics import registry
+
+        try:
+            registry.write()
+        except Exception:
+            server.log.exception('Failed to write metrics')
+
+def child_exit(server, worker):
+    from spellblade.metrics import mark_process_dead
+
+    try:
+        mark_process_dead(worker.pid, metrics_dir)
+    except Exception:
+        server.log.exception('Failed to drop the gauges of worker %s', worker.pid)
@@ -1,6 +1,11 @@
 """ASGI config for spellblade project. It exposes the ASGI callable as a module-level variable named application."""
 import os
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spellblade.settings')
 application = get_asgi_application()
+
+if settings.WARM_UP:
+    from .warmup import warm_up
+    warm_up()
@@ -0,0 +1,143 @@
+"""JSON log records and error mail, written and sent by background threads."""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from pathlib import Path
+from django.utils.log import AdminEmailHandler
+
+current_request_id = ContextVar('current_request_id', default=None)
+
+# Attributes every record has, so anything else was passed through `extra`.
+RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime', 'request_id'}
+
+class RequestIdFilter(logging.Filter):
+    """Tags records with the ID of the request being handled, if any."""
+
+    def filter(self, record):
+        record.request_id = current_request_id.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+
+        entry.update((key, value) for key, value in record.__dict__.items() if key not in RECORD_ATTRIBUTES)
+
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+
+        return json.dumps(entry, default=str)
+
+class BackgroundFileHandler(QueueHandler):
+    """
+    Formats records in the logging thread and hands them to a listener thread
+    that appends them to `filename`.
+
+    The file is reopened when it's moved, so logrotate can rotate it without a
+    restart. The listener starts on the first record in each process, as
+    threads don't survive the fork into a worker, and drains the queue at exit.
+    """
+
+    def __init__(self, filename):
+        super().__init__(queue.SimpleQueue())
+        self.filename = Path(filename)
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self._stop)
+
+    def _reset(self):
+        self._start_lock = threading.Lock()
+        self._listener = None
+
+    def _start(self):
+        with self._start_lock:
+            if self._listener is None:
+                self.filename.parent.mkdir(parents=True, exist_ok=True)
+                target = WatchedFileHandler(self.filename, encoding='utf-8')
+                self._listener = QueueListener(self.queue, target)
+                self._listener.start()
+
+    def _stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener.handlers[0].close()
+            self._listener = None
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.stack_info = None
+        return record
+
+    def emit(self, record):
+        if self._listener is None:
+            self._start()
+
+        super().emit(record)
+
+class BackgroundAdminEmailHandler(AdminEmailHandler):
+    """
+    Builds error mail in the thread that logs the error and sends it from a
+    background thread, so a slow or unreachable mail server doesn't hold up
+    the request that failed. Set `email_backend` to send directly rather than
+    through the outbox, whose transaction may be what's failing.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self._stop)
+
+    def _reset(self):
+        self.queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='admin-email', daemon=True)
+                self._thread.start()
+
+    def _stop(self):
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        while (item := self.queue.get()) is not None:
+            subject, message, args, kwargs = item
+
+            try:
+                super().send_mail(subject, message, *args, **kwargs)
+            except Exception:
+                # There's nowhere left to report it; logging would recurse.
+                pass
+            finally:
+                self.queue.task_done()
+
+    def send_mail(self, subject, message, *args, **kwargs):
+        if self._thread is None:
+            self._start()
+
+        self.queue.put((subject, message, args, kwargs))
+
+    def flush(self):
+        """Waits until the mail queued so far has been sent."""
+        if self._thread is not None:
+            self.queue.join()
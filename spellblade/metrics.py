@@ -0,0 +1,256 @@
+"""Request metrics, rendered in the Prometheus text format."""
+import atexit
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+HISTOGRAMS = ('duration', 'queries', 'query_duration', 'size')
+
+class RequestStats:
+    __slots__ = ('queries', 'query_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+current_request = ContextVar('current_request', default=None)
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels) + '}'
+
+def as_labels(pairs):
+    # Snapshots read back from JSON have lists where the registry has tuples.
+    return tuple(tuple(pair) for pair in pairs)
+
+def write_snapshot(path, snapshot):
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(snapshot))
+    os.replace(temporary, path)
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self, series):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+
+        for labels, (counts, total) in series.items():
+            cumulative = 0
+
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{format_labels((*labels, ("le", bound)))} {cumulative}'
+
+            yield f'{self.name}_sum{format_labels(labels)} {total}'
+            yield f'{self.name}_count{format_labels(labels)} {cumulative}'
+
+class Registry:
+    """
+    Request histograms plus any collectors registered by apps.
+
+    With `METRICS_DIR` unset, each process reports only its own numbers. With it
+    set, each process also writes a snapshot of its numbers to a file in that
+    directory every `METRICS_WRITE_INTERVAL` seconds, and renders the sum over
+    every file, so any worker a scrape lands on reports for all of them.
+
+    Histograms and counters are summed, including those of exited processes, so
+    they never go backwards. Gauges keep a `pid` label per process and are
+    dropped by `mark_process_dead` when the process exits.
+    """
+
+    def __init__(self):
+        self.collectors = []
+        self.duration = Histogram('spellblade_http_request_duration_seconds', 'Time spent handling the request.', LATENCY_BUCKETS)
+        self.queries = Histogram('spellblade_http_request_queries', 'Database queries issued while handling the request.', QUERY_COUNT_BUCKETS)
+        self.query_duration = Histogram('spellblade_http_request_query_duration_seconds', 'Time spent in database queries while handling the request.', LATENCY_BUCKETS)
+        self.size = Histogram('spellblade_http_response_size_bytes', 'Size of the response body.', SIZE_BUCKETS)
+        self.reset()
+        os.register_at_fork(after_in_child=self.reset)
+        atexit.register(self._write_at_exit)
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self._thread = None
+        # The pid alone could be reused by a later process and overwrite the
+        # snapshot of an exited one.
+        self.filename = f'{os.getpid()}-{secrets.token_hex(4)}.json'
+
+        for name in HISTOGRAMS:
+            getattr(self, name).series = {}
+
+    def register(self, collector):
+        """
+        Registers a callable returning `(name, type, help, samples)` tuples,
+        where `samples` is a list of `(labels, value)` pairs.
+        """
+        self.collectors.append(collector)
+
+    def observe(self, view, method, status, duration, stats, size):
+        labels = (('view', view), ('method', method), ('status', status))
+
+        with self.lock:
+            self.duration.observe(labels, duration)
+            self.queries.observe(labels, stats.queries)
+            self.query_duration.observe(labels, stats.query_seconds)
+
+            if size is not None:
+                self.size.observe(labels, size)
+
+            if self._thread is None and settings.METRICS_DIR:
+                self._thread = threading.Thread(target=self._run, name='metrics-write', daemon=True)
+                self._thread.start()
+
+    def snapshot(self):
+        with self.lock:
+            histograms = {
+                name: [(labels, list(counts), total) for labels, (counts, total) in getattr(self, name).series.items()]
+                for name in HISTOGRAMS
+            }
+
+        return {
+            'pid': os.getpid(),
+            'histograms': histograms,
+            'collectors': [family for collector in self.collectors for family in collector()],
+        }
+
+    def write(self):
+        """Writes this process's snapshot to `METRICS_DIR`, if it's set."""
+        if not settings.METRICS_DIR:
+            return
+
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        write_snapshot(directory / self.filename, self.snapshot())
+
+    def _write_at_exit(self):
+        if self._thread is not None:
+            try:
+                self.write()
+            except Exception:
+                logger.exception('Failed to write metrics at exit')
+
+    def _run(self):
+        while True:
+            time.sleep(settings.METRICS_WRITE_INTERVAL)
+
+            try:
+                self.write()
+            except Exception:
+                logger.exception('Failed to write metrics')
+
+    def read(self):
+        snapshots = []
+
+        for path in Path(settings.METRICS_DIR).glob('*.json'):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # Removed since the glob, or written by something else.
+                logger.warning('Could not read metrics from %s', path, exc_info=True)
+
+        return snapshots
+
+    def render(self):
+        if settings.METRICS_DIR:
+            self.write()
+            snapshots = self.read()
+        else:
+            snapshots = [self.snapshot()]
+
+        series = {name: {} for name in HISTOGRAMS}
+        families = {}
+
+        for snapshot in snapshots:
+            for name, rows in snapshot['histograms'].items():
+                for labels, counts, total in rows:
+                    merged = series[name].setdefault(as_labels(labels), [[0] * len(counts), 0.0])
+                    merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                    merged[1] += total
+
+            for name, type, help, samples in snapshot['collectors']:
+                values = families.setdefault(name, (type, help, {}))[2]
+
+                for labels, value in samples:
+                    labels = as_labels(labels)
+
+                    if type == 'gauge':
+                        labels = (('pid', snapshot['pid']), *labels)
+
+                    values[labels] = values.get(labels, 0) + value
+
+        lines = []
+
+        for name in HISTOGRAMS:
+            lines.extend(getattr(self, name).render(series[name]))
+
+        for name, (type, help, values) in families.items():
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {type}')
+            lines.extend(f'{name}{format_labels(labels)} {value}' for labels, value in values.items())
+
+        return '\n'.join(lines) + '\n'
+
+def mark_process_dead(pid, directory):
+    """
+    Drops the gauges from the snapshots of an exited process, keeping its
+    counters and histograms in the totals. Takes the directory rather than
+    reading settings so that a server's master process can call it.
+    """
+    for path in Path(directory).glob(f'{pid}-*.json'):
+        snapshot = json.loads(path.read_text())
+        snapshot['collectors'] = [family for family in snapshot['collectors'] if family[1] != 'gauge']
+        write_snapshot(path, snapshot)
+
+registry = Registry()
+
+def record_query(execute, sql, params, many, context):
+    stats = current_request.get()
+
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started_at
+
+def install_query_recorder(sender, connection, **kwargs):
+    # Django keeps the wrappers when a connection object reconnects.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+connection_created.connect(install_query_recorder)
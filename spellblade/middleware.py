@@ -0,0 +1,258 @@
+import logging
+import re
+import time
+import uuid
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.middleware import clickjacking, csrf, locale
+from django.utils import translation
+from .log import current_request_id
+from .metrics import RequestStats, current_request, registry
+from .routers import ReplicaPin, current_pin, pin_user
+
+logger = logging.getLogger('spellblade.request')
+
+REQUEST_ID_PATTERN = re.compile(r'[\w.:-]{1,128}')
+
+class RequestLogMiddleware:
+    """
+    Assigns each request an ID and logs its route, status and duration.
+
+    The ID is taken from an incoming `X-Request-ID` header when it looks sane, so
+    it can be followed from the proxy, and returned in the response either way.
+    Records logged while the request is handled carry it through a context
+    variable.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request_id = self.get_request_id(request)
+        token = current_request_id.set(request_id)
+        started_at = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+            self.log(request, response, time.perf_counter() - started_at)
+        finally:
+            current_request_id.reset(token)
+
+        response['X-Request-ID'] = request_id
+        return response
+
+    async def __acall__(self, request):
+        request_id = self.get_request_id(request)
+        token = current_request_id.set(request_id)
+        started_at = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+            self.log(request, response, time.perf_counter() - started_at)
+        finally:
+            current_request_id.reset(token)
+
+        response['X-Request-ID'] = request_id
+        return response
+
+    def get_request_id(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+
+        if REQUEST_ID_PATTERN.fullmatch(request_id):
+            return request_id
+
+        return uuid.uuid4().hex
+
+    def log(self, request, response, duration):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+
+        match = request.resolver_match
+
+        logger.info(
+            '%s %s %d',
+            request.method,
+            request.path,
+            response.status_code,
+            extra={
+                'route': match.view_name if match else '<unmatched>',
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+            },
+        )
+
+class MetricsMiddleware:
+    """
+    Records latency, database queries and response size per view.
+
+    Queries are attributed through a context variable, so the ones a view runs in
+    `sync_to_async` threads under ASGI are counted against the request as well.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started_at = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+
+        self.observe(request, response, time.perf_counter() - started_at, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started_at = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+
+        self.observe(request, response, time.perf_counter() - started_at, stats)
+        return response
+
+    def observe(self, request, response, duration, stats):
+        match = request.resolver_match
+
+        if response.has_header('Content-Length'):
+            size = int(response['Content-Length'])
+        elif not response.streaming:
+            size = len(response.content)
+        else:
+            size = None
+
+        registry.observe(
+            view=match.view_name if match else '<unmatched>',
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            stats=stats,
+            size=size,
+        )
+
+class ReplicaPinMiddleware:
+    """
+    Keeps a user's reads on the primary for `REPLICA_PIN_SECONDS` after a
+    request of theirs writes, through the pin `ReplicaRouter` checks once the
+    request is authenticated.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        pin = ReplicaPin(False)
+        token = current_pin.set(pin)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            current_pin.reset(token)
+
+        self.remember_write(request, pin)
+        return response
+
+    async def __acall__(self, request):
+        pin = ReplicaPin(False)
+        token = current_pin.set(pin)
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_pin.reset(token)
+
+        if pin.wrote:
+            await sync_to_async(self.remember_write)(request, pin)
+        return response
+
+    def remember_write(self, request, pin):
+        if not pin.wrote or not settings.DATABASE_REPLICAS:
+            return
+
+        # DRF copies the user it authenticated onto the Django request.
+        user = getattr(request, 'user', None)
+
+        if user is not None and user.is_authenticated:
+            pin_user(user.pk)
+
+class SkipOnApiMixin:
+    """
+    Passes requests under `API_PATH_PREFIXES` straight through.
+
+    The API authenticates with JWTs and doesn't use sessions, CSRF cookies,
+    messages or framing headers, so only the admin pays for them.
+    """
+
+    def __call__(self, request):
+        if request.path_info.startswith(settings.API_PATH_PREFIXES):
+            return self.get_response(request)
+
+        return super().__call__(request)
+
+class SessionMiddleware(SkipOnApiMixin, sessions.SessionMiddleware):
+    pass
+
+class LocaleMiddleware(locale.LocaleMiddleware):
+    def __call__(self, request):
+        # API routes keep their language prefix, so the language is taken from
+        # it directly instead of being negotiated from headers and cookies.
+        if request.path_info.startswith(settings.API_PATH_PREFIXES):
+            translation.activate(translation.get_language_from_path(request.path_info) or settings.LANGUAGE_CODE)
+            return self.get_response(request)
+
+        return super().__call__(request)
+
+class CsrfViewMiddleware(SkipOnApiMixin, csrf.CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if request.path_info.startswith(settings.API_PATH_PREFIXES):
+            return None
+
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+class AuthenticationMiddleware(SkipOnApiMixin, auth.AuthenticationMiddleware):
+    pass
+
+class MessageMiddleware(SkipOnApiMixin, messages.MessageMiddleware):
+    pass
+
+class XFrameOptionsMiddleware(SkipOnApiMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
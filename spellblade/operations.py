@@ -0,0 +1,31 @@
+"""Migration operations shared by the apps."""
+from django.contrib.postgres import operations as postgres
+from django.db import migrations
+
+class AddIndexConcurrently(postgres.AddIndexConcurrently):
+    """
+    Builds the index with `CREATE INDEX CONCURRENTLY` on PostgreSQL, so writes
+    to the table carry on while it builds, and like `AddIndex` on other
+    databases. The migration has to set `atomic = False`.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+class RunVendorSQL(migrations.RunSQL):
+    """
+    `RunSQL` with separate statements per database, as dicts keyed by
+    `connection.vendor`. Databases without any are left alone.
+    """
+
+    def _run_sql(self, schema_editor, sqls):
+        super()._run_sql(schema_editor, sqls.get(schema_editor.connection.vendor, []))
@@ -0,0 +1,77 @@
+"""Sends reads to the replicas, except for users that have just written."""
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Authentication and revocation have to see the latest writes, whichever
+# worker or client made them.
+PRIMARY_MODELS = {'spellblade_auth.user', 'spellblade_auth.outstandingtoken'}
+
+class ReplicaPin:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+current_pin = ContextVar('current_pin', default=None)
+
+def get_pin_key(user_id):
+    return f'replica_pin:{user_id}'
+
+def pin_user(user_id):
+    """Keeps the user's reads on the primary for `REPLICA_PIN_SECONDS`."""
+    cache.set(get_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+def apply_user_pin(user_id):
+    """Pins the current request to the primary if the user wrote recently."""
+    pin = current_pin.get()
+
+    if pin is not None and not pin.pinned and settings.DATABASE_REPLICAS:
+        pin.pinned = cache.get(get_pin_key(user_id)) is not None
+
+class ReplicaRouter:
+    """
+    Routes reads to a random alias in `DATABASE_REPLICAS` and everything else to
+    the primary.
+
+    Reads stay on the primary inside transactions, for models in
+    `PRIMARY_MODELS`, for the rest of a request once it has written, and for
+    `REPLICA_PIN_SECONDS` afterwards for the user who wrote, which covers the
+    replication lag. That pin is kept in the shared cache, so it holds on every
+    worker and for clients that don't keep cookies, and is applied once
+    authentication knows the user. `sync_to_async` and `BoundedPool` run their
+    calls in a copy of the request's context, so the pin is an object rather
+    than a flag: a write made there marks the request's own pin.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            not settings.DATABASE_REPLICAS
+            or model._meta.label_lower in PRIMARY_MODELS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+
+        pin = current_pin.get()
+
+        if pin is not None and (pin.pinned or pin.wrote):
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        pin = current_pin.get()
+
+        if pin is not None:
+            pin.wrote = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
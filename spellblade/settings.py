@@ -1,6 +1,9 @@
 """Django settings for spellblade project."""
 from datetime import timedelta
+import copy
 from pathlib import Path
+import sys
+import tempfile
 import environ
 import logging
 
@@ -9,12 +12,6 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 env = environ.Env()
 environ.Env.read_env(BASE_DIR / '.env')
 
-logging.basicConfig(
-    filename = BASE_DIR / 'logs/spellblade.log',
-    level = logging.ERROR,
-    format = '[%(asctime)s][%(levelname)s] %(message)s',
-)
-
 logger = logging.getLogger(__name__)
 
 SECRET_KEY = env('SECRET_KEY').strip()
@@ -22,8 +19,16 @@ DEBUG = env.bool('DEBUG', default=False)
 
 ALLOWED_HOSTS = list(filter(lambda host: host.strip(), env.list('ALLOWED_HOSTS', default=[])))
 
+# API-only deployments can leave the admin out, which also skips importing
+# every admin module at startup.
+ADMIN_ENABLED = env.bool('ADMIN_ENABLED', default=True)
+
+# Imports the URLconf, views and serializers when the WSGI or ASGI application
+# is created, so with gunicorn's preload_app workers inherit them warm.
+WARM_UP = env.bool('WARM_UP', default=True)
+
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    *(['django.contrib.admin'] if ADMIN_ENABLED else []),
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -37,14 +42,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'spellblade.middleware.RequestLogMiddleware',
+    'spellblade.middleware.MetricsMiddleware',
+    'spellblade.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.locale.LocaleMiddleware',
+    'spellblade.middleware.SessionMiddleware',
+    'spellblade.middleware.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'spellblade.middleware.CsrfViewMiddleware',
+    'spellblade.middleware.AuthenticationMiddleware',
+    'spellblade.middleware.MessageMiddleware',
+    'spellblade.middleware.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
 ]
 
@@ -68,17 +76,58 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'spellblade.wsgi.application'
 
+DB_POOL = env.bool('DB_POOL', default=True)
+DB_HEALTH_CHECKS = env.bool('DB_HEALTH_CHECKS', default=True)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'django.db.backends.postgresql',
         'NAME': env('DB_NAME', default='spellblade').strip(),
         'USER': env('DB_USER', default='spellblade').strip(),
         'PASSWORD': env('DB_PASS').strip(),
         'HOST': env('DB_HOST', default='localhost').strip(),
-        'PORT': env.int('DB_PORT', default=5432)
+        'PORT': env.int('DB_PORT', default=5432),
+        'CONN_MAX_AGE': 0 if DB_POOL else env.int('DB_CONN_MAX_AGE', default=60),
+        'CONN_HEALTH_CHECKS': DB_HEALTH_CHECKS,
+        'OPTIONS': {},
     }
 }
 
+# Django's native pool (psycopg 3) is used under both WSGI and ASGI. Persistent
+# connections (DB_POOL=False) only suit sync workers, as ASGI runs each request
+# in a different thread.
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': env.int('DB_POOL_MIN_SIZE', default=1),
+        'max_size': env.int('DB_POOL_MAX_SIZE', default=4),
+        'max_lifetime': env.float('DB_POOL_MAX_LIFETIME', default=3600),
+        'timeout': env.float('DB_POOL_TIMEOUT', default=10),
+    }
+
+    if DB_HEALTH_CHECKS:
+        from psycopg_pool import ConnectionPool
+        DATABASES['default']['OPTIONS']['pool']['check'] = ConnectionPool.check_connection
+
+# Read replicas share the primary's credentials and options. Tests mirror them
+# to the primary rather than creating their own databases.
+for index, host in enumerate(filter(lambda host: host.strip(), env.list('DB_REPLICA_HOSTS', default=[])), 1):
+    DATABASES[f'replica{index}'] = {
+        **copy.deepcopy(DATABASES['default']),
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['spellblade.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
+# Shared state such as login rate limits and cache versions lives here, so
+# CACHE_URL has to point at Redis (redis://host:6379/0) unless DEBUG is on; a
+# per-process cache would let every worker apply its own limits.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://') if DEBUG else env.cache('CACHE_URL'),
+}
+
 AUTH_USER_MODEL = 'spellblade_auth.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -104,20 +153,64 @@ SECRET_KEY_FALLBACKS = list(filter(lambda key: key.strip(), env.list('SECRET_KEY
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'spellblade_auth.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Proxies in front of the app, whose X-Forwarded-For entries are trusted
+    # when identifying clients for rate limits.
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
 }
 
+JWT_ALGORITHM = env('JWT_ALGORITHM', default='HS256').strip()
+JWT_PRIVATE_KEY_FILE = env('JWT_PRIVATE_KEY_FILE', default='').strip()
+JWT_PRIVATE_KEY_FALLBACK_FILES = list(filter(lambda path: path.strip(), env.list('JWT_PRIVATE_KEY_FALLBACK_FILES', default=[])))
+JWKS_MAX_AGE = env.int('JWKS_MAX_AGE', default=3600)
+
 SIMPLE_JWT = {
+    'ALGORITHM': JWT_ALGORITHM,
+    'AUTH_TOKEN_CLASSES': ('spellblade_auth.tokens.AccessToken',),
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
     'ROTATE_REFRESH_TOKENS': True,
     'UPDATE_LAST_LOGIN': True,
 }
 
+LOGIN_POOL_WORKERS = env.int('LOGIN_POOL_WORKERS', default=2)
+LOGIN_POOL_QUEUE = env.int('LOGIN_POOL_QUEUE', default=8)
+LOGIN_POOL_RETRY_AFTER = env.int('LOGIN_POOL_RETRY_AFTER', default=1)
+
+LOGIN_THROTTLE_IP_RATE = env('LOGIN_THROTTLE_IP_RATE', default='30/min').strip() or None
+LOGIN_THROTTLE_USERNAME_RATE = env('LOGIN_THROTTLE_USERNAME_RATE', default='10/min').strip() or None
+
+LAST_LOGIN_FLUSH_INTERVAL = env.int('LAST_LOGIN_FLUSH_INTERVAL', default=30)
+LAST_LOGIN_FLUSH_SIZE = env.int('LAST_LOGIN_FLUSH_SIZE', default=1000)
+
+OUTSTANDING_TOKEN_CACHE_SIZE = env.int('OUTSTANDING_TOKEN_CACHE_SIZE', default=10000)
+OUTSTANDING_TOKEN_CACHE_TTL = env.int('OUTSTANDING_TOKEN_CACHE_TTL', default=60)
+OUTSTANDING_TOKEN_FILTER_CAPACITY = env.int('OUTSTANDING_TOKEN_FILTER_CAPACITY', default=1000000)
+OUTSTANDING_TOKEN_FILTER_ERROR_RATE = env.float('OUTSTANDING_TOKEN_FILTER_ERROR_RATE', default=0.01)
+OUTSTANDING_TOKEN_FILTER_INTERVAL = env.int('OUTSTANDING_TOKEN_FILTER_INTERVAL', default=300)
+
+USER_CACHE_SIZE = env.int('USER_CACHE_SIZE', default=10000)
+USER_CACHE_TTL = env.int('USER_CACHE_TTL', default=300)
+
+OCCURRENCES_DEFAULT_DAYS = env.int('OCCURRENCES_DEFAULT_DAYS', default=90)
+OCCURRENCES_MAX_DAYS = env.int('OCCURRENCES_MAX_DAYS', default=366)
+OCCURRENCES_MAX_RESULTS = env.int('OCCURRENCES_MAX_RESULTS', default=5000)
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = env.int('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=10000)
+
+LIST_PAGE_SIZE = env.int('LIST_PAGE_SIZE', default=50)
+LIST_MAX_PAGE_SIZE = env.int('LIST_MAX_PAGE_SIZE', default=200)
+
+SYNC_MAX_PAGE_SIZE = env.int('SYNC_MAX_PAGE_SIZE', default=1000)
+
+BULK_MAX_OPERATIONS = env.int('BULK_MAX_OPERATIONS', default=500)
+
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000)
+
 LOCALE_PATHS = [
     BASE_DIR / 'locale',
 ]
@@ -126,8 +219,6 @@ LANGUAGES = [
     ('en-us', 'English (US)'),
 ]
 
-CORS_ALLOWED_ORIGINS = list(filter(lambda origin: origin.strip(), env.list('CORS_ALLOWED_ORIGINS', default=[])))
-
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL').strip()
 SERVER_EMAIL = env('SERVER_EMAIL').strip()
 ADMINS = [
@@ -143,6 +234,92 @@ EMAIL_PORT = env.int('EMAIL_PORT', default=587)
 EMAIL_USE_SSL = env.bool('EMAIL_USE_SSL', default=False)
 EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=True)
 
+# Mail is queued in the outbox inside the sender's transaction and delivered
+# by `manage.py send_outbox` through OUTBOX_EMAIL_BACKEND.
+EMAIL_BACKEND = 'spellblade_core.mail.OutboxEmailBackend'
+OUTBOX_EMAIL_BACKEND = env('OUTBOX_EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend').strip()
+OUTBOX_BATCH_SIZE = env.int('OUTBOX_BATCH_SIZE', default=50)
+OUTBOX_POLL_INTERVAL = env.float('OUTBOX_POLL_INTERVAL', default=5)
+OUTBOX_LEASE = env.int('OUTBOX_LEASE', default=300)
+OUTBOX_MAX_ATTEMPTS = env.int('OUTBOX_MAX_ATTEMPTS', default=8)
+OUTBOX_RETRY_DELAY = env.int('OUTBOX_RETRY_DELAY', default=60)
+OUTBOX_RETRY_MAX_DELAY = env.int('OUTBOX_RETRY_MAX_DELAY', default=3600)
+
+# Test runs log to the temporary directory rather than into the checkout.
+TESTING = sys.argv[1:2] == ['test']
+LOG_FILE = env(
+    'LOG_FILE',
+    default=str(Path(tempfile.gettempdir()) / 'spellblade-test.log' if TESTING else BASE_DIR / 'logs/spellblade.log'),
+).strip()
+LOG_LEVEL = env('LOG_LEVEL', default='ERROR').strip().upper()
+LOG_REQUESTS = env.bool('LOG_REQUESTS', default=False)
+
+# Records are formatted as JSON lines in the thread that logs them and written
+# by a background thread, so raising the level doesn't put disk writes on the
+# request path.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'spellblade.log.RequestIdFilter'},
+        'require_debug_false': {'()': 'django.utils.log.RequireDebugFalse'},
+        'require_debug_true': {'()': 'django.utils.log.RequireDebugTrue'},
+    },
+    'formatters': {
+        'json': {'()': 'spellblade.log.JsonFormatter'},
+    },
+    'handlers': {
+        'file': {
+            'class': 'spellblade.log.BackgroundFileHandler',
+            'filename': LOG_FILE,
+            'filters': ['request_id'],
+            'formatter': 'json',
+        },
+        'console': {
+            'class': 'logging.StreamHandler',
+            'level': 'INFO',
+            'filters': ['require_debug_true'],
+        },
+        # Errors are mailed to ADMINS directly rather than through the outbox,
+        # which may be what's failing and only queues mail that commits, from a
+        # background thread so the failed request doesn't wait on SMTP.
+        'mail_admins': {
+            'class': 'spellblade.log.BackgroundAdminEmailHandler',
+            'level': 'ERROR',
+            'filters': ['require_debug_false'],
+            'email_backend': OUTBOX_EMAIL_BACKEND,
+        },
+    },
+    'root': {
+        'handlers': ['file'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['console', 'mail_admins'],
+        },
+        'spellblade.request': {
+            'level': 'INFO' if LOG_REQUESTS else LOG_LEVEL,
+        },
+    },
+}
+
+# Requests under these prefixes skip the session, locale, CSRF, auth, messages
+# and clickjacking middleware, which only the admin needs.
+API_PATH_PREFIXES = (
+    '/metrics/',
+    *(f'/{code}/{app}/' for code, name in LANGUAGES for app in ('auth', 'core')),
+)
+
+METRICS_ALLOWED_IPS = list(filter(lambda ip: ip.strip(), env.list('METRICS_ALLOWED_IPS', default=['127.0.0.1', '::1'])))
+# Processes that share this directory report metrics summed across all of
+# them; gunicorn.conf.py sets it for its workers. Left unset, each process
+# reports only its own.
+METRICS_DIR = env('METRICS_DIR', default='').strip() or None
+METRICS_WRITE_INTERVAL = env.float('METRICS_WRITE_INTERVAL', default=5)
+
+CORS_ALLOWED_ORIGINS = list(filter(lambda origin: origin.strip(), env.list('CORS_ALLOWED_ORIGINS', default=[])))
+
 if not DEBUG:
     REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
         'rest_framework.renderers.JSONRenderer',
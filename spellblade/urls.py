@@ -1,17 +1,24 @@
 """URL configuration for spellblade project."""
-from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 from django.conf.urls.i18n import i18n_patterns
+from .views import metrics
 
-urlpatterns = i18n_patterns(
-    path('admin/', admin.site.urls),
+urlpatterns = [
+    path('metrics/', metrics, name='metrics'),
+]
+
+localized_urlpatterns = [
     path('core/', include('spellblade_core.urls')),
     path('auth/', include('spellblade_auth.urls')),
+]
+
+if settings.ADMIN_ENABLED:
+    from django.contrib import admin
+    localized_urlpatterns.insert(0, path('admin/', admin.site.urls))
 
-    prefix_default_language=True
-)
+urlpatterns += i18n_patterns(*localized_urlpatterns, prefix_default_language=True)
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
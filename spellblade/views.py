@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+from .metrics import registry
+
+@require_GET
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,6 +1,11 @@
 """WSGI config for spellblade project. It exposes the WSGI callable as a module-level variable named application."""
 import os
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spellblade.settings')
 application = get_wsgi_application()
+
+if settings.WARM_UP:
+    from .warmup import warm_up
+    warm_up()
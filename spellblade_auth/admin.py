@@ -5,6 +5,7 @@ from django.contrib.auth.admin import (
     UserAdmin as BaseUserAdmin,
 )
 from django.utils.translation import gettext_lazy as _
+from spellblade.admin import LargeTableAdminMixin
 from .models import Group, User, OutstandingToken
 
 admin.site.unregister(DjangoGroup)
@@ -14,7 +15,7 @@ class GroupAdmin(BaseGroupAdmin):
     pass
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
     list_display = ('username', 'email', 'full_name', 'date_joined', 'last_login')
     list_filter = ('is_staff', 'is_active', 'groups')
     search_fields = ('username', 'email', 'full_name')
@@ -38,10 +39,10 @@ class UserAdmin(BaseUserAdmin):
     )
 
 @admin.register(OutstandingToken)
-class OutstandingTokenAdmin(admin.ModelAdmin):
+class OutstandingTokenAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     ordering = ('user', 'expires_at')
-    list_display = ('user', 'email', 'full_name', 'token', 'expires_at')
-    search_fields = ('user__username', 'user__email', 'user__full_name', 'token')
+    list_display = ('user', 'user__email', 'user__full_name', 'token', 'expires_at')
+    search_fields = ('token__exact', '^user__username', '^user__email')
 
     actions = None
 
@@ -56,9 +57,3 @@ class OutstandingTokenAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return request.method in ["GET", "HEAD"] and super().has_change_permission(request, obj)
-
-    def email(self, obj):
-        return obj.user.email
-
-    def full_name(self, obj):
-        return obj.user.full_name
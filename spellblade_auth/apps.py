@@ -5,3 +5,9 @@ class SpellbladeAuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'spellblade_auth'
     verbose_name = _('Authentication & Authorization')
+
+    def ready(self):
+        from spellblade.metrics import registry
+        from . import metrics, signals
+
+        registry.register(metrics.collect)
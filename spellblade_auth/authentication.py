@@ -0,0 +1,28 @@
+import time
+from functools import partial
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication as BaseJWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from spellblade.routers import apply_user_pin
+from .cache import user_cache
+from .tokens import get_token_generation
+
+class JWTAuthentication(BaseJWTAuthentication):
+    def get_user(self, validated_token):
+        user = user_cache.get(
+            validated_token.get(api_settings.USER_ID_CLAIM),
+            partial(super().get_user, validated_token),
+            validated_token['exp'] - time.time(),
+        )
+
+        # Loading checks this too, but a cached user skips the load.
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if get_token_generation(validated_token) != user.token_generation:
+            raise AuthenticationFailed(_('Token has been revoked.'), code='token_revoked')
+
+        apply_user_pin(user.pk)
+
+        return user
@@ -0,0 +1,95 @@
+import atexit
+import logging
+import os
+import threading
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+class LastLoginBuffer:
+    """
+    Coalesces `last_login` updates into one bulk UPDATE per flush.
+
+    Logins only record the timestamp in memory. A background thread writes the
+    pending timestamps every `interval` seconds, or sooner once `max_size` users
+    are pending, and the process flushes whatever is left when it exits. An
+    `interval` of zero writes each login synchronously instead.
+    """
+
+    def __init__(self, interval, max_size):
+        self.interval = interval
+        self.max_size = max_size
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self._flush_at_exit)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = {}
+        self._thread = None
+
+    def record(self, user):
+        user.last_login = timezone.now()
+
+        if not self.interval:
+            user.save(update_fields=['last_login'])
+            return
+
+        with self._lock:
+            self._pending[user.pk] = user.last_login
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+                self._thread.start()
+
+            if len(self._pending) >= self.max_size:
+                self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        try:
+            User.objects.bulk_update(
+                [User(pk=pk, last_login=last_login) for pk, last_login in pending.items()],
+                ['last_login'],
+                batch_size=1000,
+            )
+        except Exception:
+            # Put the timestamps back unless a newer login for the same user
+            # was recorded in the meantime, so the next flush retries them.
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            raise
+
+        return len(pending)
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush last login timestamps at exit')
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush last login timestamps')
+            finally:
+                connection.close()
+
+last_login_buffer = LastLoginBuffer(
+    interval=settings.LAST_LOGIN_FLUSH_INTERVAL,
+    max_size=settings.LAST_LOGIN_FLUSH_SIZE,
+)
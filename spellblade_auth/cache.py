@@ -0,0 +1,430 @@
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from .models import User, OutstandingToken
+
+logger = logging.getLogger(__name__)
+
+CachedToken = namedtuple('CachedToken', ('pk', 'user_id', 'expires_at', 'generation', 'version'))
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over SHA-1 hex digests.
+
+    The digests are already uniformly distributed, so the bit positions are
+    derived from the digest itself by double hashing instead of rehashing it.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest):
+        h1 = int(digest[:20], 16)
+        h2 = int(digest[20:], 16) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+class LRUCache:
+    """
+    Thread-safe LRU mapping whose entries also expire after a per-entry TTL.
+    A `max_size` of zero disables caching.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+
+            if item is None:
+                return None
+
+            value, deadline = item
+
+            if deadline <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if not self.max_size or ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [key for key, (value, _) in self._entries.items() if predicate(key, value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class SharedVersions:
+    """
+    Version numbers kept in the shared Django cache, which every process checks
+    its local entries against. Bumping a version in one process invalidates the
+    matching entries everywhere on their next use.
+
+    There is a version per key and one for all keys. A version that was evicted
+    from the shared cache comes back at a random value, so entries tagged before
+    the eviction don't match it. If the shared cache is unreachable, `get`
+    returns `None` and callers should skip their local cache, and `bump` logs
+    the failure rather than raising.
+    """
+
+    def __init__(self, prefix, timeout=86400):
+        self.prefix = prefix
+        self.timeout = timeout
+
+    def get(self, key):
+        keys = [f'{self.prefix}:*', f'{self.prefix}:{key}']
+
+        try:
+            versions = shared_cache.get_many(keys)
+
+            for missing in set(keys) - versions.keys():
+                shared_cache.add(missing, secrets.randbits(62), self.timeout)
+                versions[missing] = shared_cache.get(missing)
+        except Exception:
+            logger.warning('Could not read %s versions from the shared cache', self.prefix, exc_info=True)
+            return None
+
+        return tuple(versions[key] for key in keys)
+
+    def bump(self, key='*'):
+        try:
+            shared_cache.incr(f'{self.prefix}:{key}')
+        except ValueError:
+            # A missing version is recreated at a random value on its next read,
+            # which invalidates just the same.
+            pass
+        except Exception:
+            # Don't fail the write that's invalidating. Readers skip their local
+            # cache while the shared one is down, and other processes' entries
+            # expire after their TTL.
+            logger.warning('Could not bump %s version %s in the shared cache', self.prefix, key, exc_info=True)
+
+class OutstandingTokenCache:
+    """
+    Per-process cache of outstanding refresh token digests.
+
+    Valid digests are kept in an LRU with a TTL. Each process also keeps a Bloom
+    filter built from a snapshot of every unexpired digest, which rejects tokens
+    issued before the snapshot without a database round trip. Tokens issued after
+    the snapshot, including ones issued by other processes, always fall through
+    to the database until the next rebuild picks them up. The snapshot is taken
+    by whichever process finds it stale first and shared through the Django
+    cache, so the table is scanned once per `filter_interval` however many
+    workers there are.
+
+    Entries are tagged with the user's version in `SharedVersions`, which
+    revoking the user's tokens or deleting one of them bumps, so a hit never
+    returns a generation or a token that changed in another process. Rotation
+    and deletion also go through conditional writes that match on the old
+    digest and the user's token generation, so concurrent requests can never
+    rotate or delete a token twice.
+    """
+
+    def __init__(
+        self,
+        max_size,
+        ttl,
+        filter_capacity,
+        filter_error_rate,
+        filter_interval,
+        versions,
+        filter_margin=60,
+        filter_poll=10,
+        filter_key='outstanding_token_filter',
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.versions = versions
+        self.filter_capacity = filter_capacity
+        self.filter_error_rate = filter_error_rate
+        self.filter_interval = filter_interval
+        self.filter_margin = filter_margin
+        self.filter_poll = filter_poll
+        self.filter_key = filter_key
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._entries = LRUCache(self.max_size)
+        self._filter = None
+        self._filter_built_at = 0
+        self._filter_checked_at = 0
+        self._filter_thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.filtered = 0
+
+    def _cache(self, digest, entry):
+        if entry.version is None:
+            return
+
+        self._entries.set(digest, entry, min(self.ttl, (entry.expires_at - timezone.now()).total_seconds()))
+
+    def _build_filter(self):
+        built_at = time.time()
+        bloom = BloomFilter(self.filter_capacity, self.filter_error_rate)
+
+        for digest in OutstandingToken.objects.filter(expires_at__gt=timezone.now()).values_list('token', flat=True).iterator(chunk_size=10000):
+            bloom.add(digest)
+
+        return built_at, bloom
+
+    def _refresh_filter(self):
+        try:
+            shared = shared_cache.get(self.filter_key)
+
+            # Other processes keep using the filter they have until the one
+            # rebuilding it shares the new one.
+            if (shared is None or time.time() - shared[0] >= self.filter_interval) and shared_cache.add(
+                f'{self.filter_key}:lock', True, self.filter_interval,
+            ):
+                shared = self._build_filter()
+                shared_cache.set(self.filter_key, shared, 2 * self.filter_interval)
+
+            if shared is not None:
+                with self._lock:
+                    self._filter_built_at, self._filter = shared
+        except Exception:
+            logger.exception('Failed to refresh the outstanding token filter')
+        finally:
+            connection.close()
+
+    def _get_filter(self):
+        if not self.filter_capacity:
+            return None, 0
+
+        with self._lock:
+            now = time.time()
+            stale = now - self._filter_built_at >= self.filter_interval and now - self._filter_checked_at >= self.filter_poll
+            running = self._filter_thread is not None and self._filter_thread.is_alive()
+
+            if stale and not running:
+                self._filter_checked_at = now
+                self._filter_thread = threading.Thread(target=self._refresh_filter, name='outstanding-token-filter', daemon=True)
+                self._filter_thread.start()
+
+            return self._filter, self._filter_built_at
+
+    def get(self, digest, token):
+        """
+        Returns the `CachedToken` for a digest, or `None` if it is not outstanding.
+        `token` is the verified refresh token the digest was computed from.
+        """
+        # The version is read before the row, so a revocation that commits in
+        # between leaves an entry that never matches.
+        version = self.versions.get(token.get(api_settings.USER_ID_CLAIM))
+        entry = self._entries.get(digest)
+
+        if entry is not None and version is not None and entry.version == version:
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        bloom, built_at = self._get_filter()
+
+        if bloom is not None and token['iat'] < built_at - self.filter_margin and digest not in bloom:
+            with self._lock:
+                self.filtered += 1
+            return None
+
+        with self._lock:
+            self.misses += 1
+        row = (
+            OutstandingToken.objects
+            .filter(token=digest)
+            .values_list('pk', 'user_id', 'expires_at', 'user__token_generation')
+            .first()
+        )
+
+        if row is None:
+            return None
+
+        entry = CachedToken(*row, version)
+        self._cache(digest, entry)
+        return entry
+
+    def create(self, user, digest, expires_at):
+        version = self.versions.get(user.pk)
+        obj = OutstandingToken.objects.create(user=user, token=digest, generation=user.token_generation, expires_at=expires_at)
+        self._cache(digest, CachedToken(obj.pk, obj.user_id, obj.expires_at, obj.generation, version))
+        return obj
+
+    def rotate(self, entry, digest, new_digest, expires_at):
+        """
+        Replaces the digest of an outstanding token, unless another request
+        rotated, deleted or revoked it first. Returns whether the rotation happened.
+        """
+        self._entries.delete(digest)
+        updated = (
+            OutstandingToken.objects
+            .filter(pk=entry.pk, token=digest, user__token_generation=entry.generation)
+            .update(token=new_digest, expires_at=expires_at)
+        )
+
+        if updated:
+            self._cache(new_digest, entry._replace(expires_at=expires_at))
+
+        return bool(updated)
+
+    def delete(self, entry, digest):
+        self._entries.delete(digest)
+        deleted, _ = OutstandingToken.objects.filter(pk=entry.pk, token=digest).delete()
+
+        # Other processes may still have the token cached.
+        user_cache.invalidate(entry.user_id)
+        return bool(deleted)
+
+    def revoke_user(self, user):
+        """
+        Revokes every token issued to a user by bumping their token generation.
+        Their outstanding rows are left for `purge_expired_tokens` to delete.
+        """
+        self._entries.delete_where(lambda digest, entry: entry.user_id == user.pk)
+        User.objects.filter(pk=user.pk).update(token_generation=F('token_generation') + 1)
+        user_cache.invalidate(user.pk)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'filtered': self.filtered,
+                'filter_age': time.time() - self._filter_built_at if self._filter is not None else None,
+            }
+
+class UserCache:
+    """
+    Per-process cache of the users that access tokens resolve to.
+
+    An entry lives until the access token that loaded it expires, capped at
+    `USER_CACHE_TTL` seconds. Entries are tagged with the user's version in
+    `SharedVersions`, and a hit only counts while that version is unchanged,
+    which costs one shared cache round trip instead of a database query.
+    Saving or deleting a user, changing groups or permissions, or revoking
+    their tokens bumps the version through `invalidate`, so the change takes
+    effect in every process at once. Each hit builds a fresh instance from the
+    cached row, so callers may modify the user they get back.
+    """
+
+    def __init__(self, max_size, ttl, versions):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.versions = versions
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._entries = LRUCache(self.max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, load, ttl):
+        """
+        Returns the user with `user_id`, calling `load` to fetch it on a miss.
+        The version is read before loading, so a change that commits while the
+        row is fetched leaves an entry that never matches.
+        """
+        version = self.versions.get(user_id)
+        item = self._entries.get(user_id)
+
+        if version is not None and item is not None and item[0] == version:
+            with self._lock:
+                self.hits += 1
+
+            version, db, values = item
+            return User.from_db(db, [f.attname for f in User._meta.concrete_fields], values)
+
+        with self._lock:
+            self.misses += 1
+
+        user = load()
+
+        if version is not None:
+            values = tuple(getattr(user, f.attname) for f in User._meta.concrete_fields)
+            self._entries.set(user_id, (version, user._state.db, values), min(self.ttl, ttl))
+
+        return user
+
+    def invalidate(self, user_id=None):
+        """
+        Invalidates one user, or every user if `user_id` is `None`, in every
+        process. The version is bumped again once the current transaction
+        commits, so a process that loaded the old row in between doesn't keep it.
+        """
+        self._bump(user_id)
+        transaction.on_commit(lambda: self._bump(user_id))
+
+    def _bump(self, user_id):
+        if user_id is None:
+            self._entries.clear()
+            self.versions.bump()
+        else:
+            self._entries.delete(user_id)
+            self.versions.bump(user_id)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+user_versions = SharedVersions('user_version')
+
+outstanding_token_cache = OutstandingTokenCache(
+    max_size=settings.OUTSTANDING_TOKEN_CACHE_SIZE,
+    ttl=settings.OUTSTANDING_TOKEN_CACHE_TTL,
+    filter_capacity=settings.OUTSTANDING_TOKEN_FILTER_CAPACITY,
+    filter_error_rate=settings.OUTSTANDING_TOKEN_FILTER_ERROR_RATE,
+    filter_interval=settings.OUTSTANDING_TOKEN_FILTER_INTERVAL,
+    versions=user_versions,
+)
+
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+    versions=user_versions,
+)
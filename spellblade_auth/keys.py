@@ -0,0 +1,104 @@
+import base64
+import json
+from hashlib import sha256
+from pathlib import Path
+import jwt
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from jwt.algorithms import get_default_algorithms
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+# Required members of each key type, which make up its RFC 7638 thumbprint.
+THUMBPRINT_MEMBERS = {
+    'RSA': ('e', 'kty', 'n'),
+    'EC': ('crv', 'kty', 'x', 'y'),
+    'OKP': ('crv', 'kty', 'x'),
+}
+
+class SigningKey:
+    def __init__(self, algorithm, pem):
+        implementation = get_default_algorithms()[algorithm]
+
+        self.private_key = implementation.prepare_key(pem)
+        self.public_key = self.private_key.public_key()
+
+        jwk = implementation.to_jwk(self.public_key, as_dict=True)
+        thumbprint = json.dumps({member: jwk[member] for member in THUMBPRINT_MEMBERS[jwk['kty']]}, separators=(',', ':'), sort_keys=True)
+
+        self.kid = base64.urlsafe_b64encode(sha256(thumbprint.encode('utf-8')).digest()).rstrip(b'=').decode('ascii')
+        self.jwk = {**jwk, 'kid': self.kid, 'alg': algorithm, 'use': 'sig'}
+
+class RotatingTokenBackend(TokenBackend):
+    """
+    Token backend for asymmetric algorithms that signs with the first of `keys`
+    and verifies with whichever key the token's `kid` header names.
+
+    The keys play the same roles as `SECRET_KEY` and `SECRET_KEY_FALLBACKS`. To
+    rotate, publish the new key as a fallback first, so services verifying
+    against the JWKS endpoint pick it up. Then promote it to the signing key.
+    Drop the old key once every token it signed has expired.
+    """
+
+    def __init__(self, algorithm, keys, **kwargs):
+        super().__init__(algorithm, **kwargs)
+        self.current = keys[0]
+        self.keys = {key.kid: key for key in keys}
+        self.signing_key = self.current.private_key
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        return jwt.encode(
+            jwt_payload,
+            self.current.private_key,
+            algorithm=self.algorithm,
+            headers={'kid': self.current.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def get_verifying_key(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_('Token is invalid or expired')) from ex
+
+        if kid not in self.keys:
+            raise TokenBackendError(_('Token is invalid or expired'))
+
+        return self.keys[kid].public_key
+
+    def jwks(self):
+        return {'keys': [key.jwk for key in self.keys.values()]}
+
+def load_keys(algorithm, paths):
+    if not paths[0]:
+        raise ImproperlyConfigured(f'JWT_PRIVATE_KEY_FILE must be set to sign tokens with {algorithm}.')
+
+    return [SigningKey(algorithm, Path(path).read_bytes()) for path in paths]
+
+def get_jwks():
+    if isinstance(token_backend, RotatingTokenBackend):
+        return token_backend.jwks()
+
+    return {'keys': []}
+
+if settings.JWT_ALGORITHM.startswith('HS'):
+    token_backend = import_string('rest_framework_simplejwt.state.token_backend')
+else:
+    token_backend = RotatingTokenBackend(
+        settings.JWT_ALGORITHM,
+        load_keys(settings.JWT_ALGORITHM, [settings.JWT_PRIVATE_KEY_FILE, *settings.JWT_PRIVATE_KEY_FALLBACK_FILES]),
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY,
+        json_encoder=api_settings.JSON_ENCODER,
+    )
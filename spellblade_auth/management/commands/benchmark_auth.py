@@ -0,0 +1,236 @@
+import asyncio
+import json
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha1
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone, translation
+from spellblade_auth.models import User, OutstandingToken
+from spellblade_auth.tokens import RefreshToken
+
+USERNAME_PREFIX = 'benchmark-'
+PASSWORD = 'benchmark-password'
+ENDPOINTS = ('login', 'login_renew', 'logout', 'logout_all')
+INTERFACES = ('wsgi', 'asgi')
+
+class QueryCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the auth endpoints against the configured database through '
+        'the WSGI and ASGI handlers. Seeded users are removed afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Users to seed.')
+        parser.add_argument('--tokens', type=int, default=1000, help='Outstanding tokens to seed.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once.')
+        parser.add_argument('--interface', choices=INTERFACES, action='append', help='Handler to drive; repeatable. Defaults to both.')
+        parser.add_argument('--endpoint', choices=ENDPOINTS, action='append', help='Endpoint to drive; repeatable. Defaults to all.')
+        parser.add_argument('--output', help='Append the results as a JSON line to this file.')
+        parser.add_argument('--compare', help='Compare the results with the last run recorded in this file.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+
+        # Tokens are seeded afresh for each endpoint, and renew and logout use
+        # one up per request.
+        if options['tokens'] < options['requests']:
+            raise CommandError('--tokens must be at least --requests, as renew and logout each use up a token.')
+
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError(f'Users named {USERNAME_PREFIX}* already exist; remove them before benchmarking.')
+
+        results = []
+        counter = QueryCounter()
+        connection_created.connect(counter.install)
+
+        try:
+            with translation.override(settings.LANGUAGE_CODE), override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False, LOGIN_THROTTLE_IP_RATE=None, LOGIN_THROTTLE_USERNAME_RATE=None):
+                for interface in options['interface'] or INTERFACES:
+                    for endpoint in options['endpoint'] or ENDPOINTS:
+                        fixtures = self.seed(options['users'], options['tokens'])
+
+                        try:
+                            requests = self.get_requests(endpoint, fixtures, options['requests'])
+                            connections.close_all()
+                            queries = counter.count
+                            latencies, errors, elapsed = getattr(self, f'drive_{interface}')(requests, options['concurrency'])
+                            connections.close_all()
+                            queries = counter.count - queries
+                        finally:
+                            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+                        latencies.sort()
+                        results.append({
+                            'interface': interface,
+                            'endpoint': endpoint,
+                            'requests': len(requests),
+                            'errors': errors,
+                            'rps': len(requests) / elapsed,
+                            'p50': percentile(latencies, 50) * 1000,
+                            'p95': percentile(latencies, 95) * 1000,
+                            'p99': percentile(latencies, 99) * 1000,
+                            'queries': queries / len(requests),
+                        })
+        finally:
+            connection_created.disconnect(counter.install)
+
+        previous = self.load(options['compare']) if options['compare'] else None
+        self.report(results, previous)
+
+        if options['output']:
+            self.save(options['output'], options, results)
+
+    def seed(self, users, tokens):
+        password = make_password(PASSWORD)
+        created = User.objects.bulk_create(
+            User(username=f'{USERNAME_PREFIX}{i}', email=f'{USERNAME_PREFIX}{i}@example.com', password=password)
+            for i in range(users)
+        )
+
+        refresh_tokens = []
+        rows = []
+        expires_at = timezone.now() + settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME']
+
+        for i in range(tokens):
+            user = created[i % users]
+            refresh = str(RefreshToken.for_user(user))
+            refresh_tokens.append(refresh)
+            rows.append(OutstandingToken(user=user, token=sha1(refresh.encode('utf-8')).hexdigest(), expires_at=expires_at))
+
+        OutstandingToken.objects.bulk_create(rows, batch_size=1000)
+
+        return {
+            'users': created,
+            'refresh_tokens': refresh_tokens,
+            'access_tokens': [str(RefreshToken.for_user(user).access_token) for user in created],
+        }
+
+    def get_requests(self, endpoint, fixtures, count):
+        path = reverse(endpoint)
+
+        if endpoint == 'login':
+            return [(path, {'username': fixtures['users'][i % len(fixtures['users'])].username, 'password': PASSWORD}, {}) for i in range(count)]
+
+        if endpoint in ('login_renew', 'logout'):
+            return [(path, {'token': token}, {}) for token in fixtures['refresh_tokens'][:count]]
+
+        # Logging out everywhere revokes the access token it was called with,
+        # so each user can only be used once.
+        return [(path, {}, {'Authorization': f'Bearer {token}'}) for token in fixtures['access_tokens'][:count]]
+
+    def drive_wsgi(self, requests, concurrency):
+        local = threading.local()
+
+        def send(request):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+
+            path, data, headers = request
+            started_at = time.perf_counter()
+            response = local.client.post(path, data, content_type='application/json', headers=headers)
+            return time.perf_counter() - started_at, response.status_code
+
+        started_at = time.perf_counter()
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            timings = list(executor.map(send, requests))
+
+        elapsed = time.perf_counter() - started_at
+        return [latency for latency, _ in timings], sum(status >= 400 for _, status in timings), elapsed
+
+    def drive_asgi(self, requests, concurrency):
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def send(request):
+                async with semaphore:
+                    path, data, headers = request
+                    started_at = time.perf_counter()
+                    response = await client.post(path, data, content_type='application/json', headers=headers)
+                    return time.perf_counter() - started_at, response.status_code
+
+            return await asyncio.gather(*(send(request) for request in requests))
+
+        started_at = time.perf_counter()
+        timings = asyncio.run(run())
+        elapsed = time.perf_counter() - started_at
+        return [latency for latency, _ in timings], sum(status >= 400 for _, status in timings), elapsed
+
+    def report(self, results, previous):
+        baseline = {(r['interface'], r['endpoint']): r for r in previous['results']} if previous else {}
+
+        self.stdout.write(f'{"interface":<10}{"endpoint":<14}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>9}{"errors":>8}')
+
+        for result in results:
+            line = (
+                f'{result["interface"]:<10}{result["endpoint"]:<14}{result["rps"]:>10.1f}'
+                f'{result["p50"]:>10.1f}{result["p95"]:>10.1f}{result["p99"]:>10.1f}'
+                f'{result["queries"]:>9.1f}{result["errors"]:>8}'
+            )
+
+            before = baseline.get((result['interface'], result['endpoint']))
+
+            if before:
+                line += f'  req/s {(result["rps"] / before["rps"] - 1) * 100:+.0f}%, p95 {(result["p95"] / before["p95"] - 1) * 100:+.0f}%'
+
+            self.stdout.write(line)
+
+        if previous:
+            self.stdout.write(f'Compared with {previous["commit"] or "an unknown commit"} from {previous["timestamp"]}.')
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            raise CommandError(f'{path} does not exist.')
+
+        if not lines:
+            raise CommandError(f'{path} has no recorded runs.')
+
+        return json.loads(lines[-1])
+
+    def save(self, path, options, results):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+
+        with open(path, 'a') as f:
+            f.write(json.dumps({
+                'commit': commit,
+                'timestamp': timezone.now().isoformat(),
+                'options': {key: options[key] for key in ('users', 'tokens', 'requests', 'concurrency')},
+                'results': results,
+            }) + '\n')
@@ -0,0 +1,63 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.utils import load_backend
+
+def summarize(timings):
+    timings = sorted(timings)
+    return (
+        sum(timings) / len(timings) * 1000,
+        timings[len(timings) // 2] * 1000,
+        timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+    )
+
+class Command(BaseCommand):
+    help = (
+        'Measures the cost of a short query on a freshly opened database connection '
+        'against the configured pooled or persistent connections.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Queries to run in each mode.')
+        parser.add_argument('--database', default='default', help='Database alias to benchmark.')
+
+    def handle(self, *args, iterations, database, **options):
+        connection = connections[database]
+
+        settings_dict = {**connection.settings_dict, 'CONN_MAX_AGE': 0}
+        settings_dict['OPTIONS'] = {key: value for key, value in settings_dict['OPTIONS'].items() if key != 'pool'}
+        unpooled = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, f'{database}-unpooled')
+
+        fresh = []
+
+        for _ in range(iterations):
+            started_at = time.perf_counter()
+
+            with unpooled.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+            unpooled.close()
+            fresh.append(time.perf_counter() - started_at)
+
+        # Each iteration is bracketed the way Django brackets a request, so
+        # connections are released and reused exactly as they would be in
+        # production with the configured CONN_MAX_AGE or pool.
+        reused = []
+        close_old_connections()
+
+        for _ in range(iterations):
+            started_at = time.perf_counter()
+            close_old_connections()
+
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+            close_old_connections()
+            reused.append(time.perf_counter() - started_at)
+
+        mode = 'pooled' if connection.settings_dict['OPTIONS'].get('pool') else f'CONN_MAX_AGE={connection.settings_dict["CONN_MAX_AGE"]}'
+
+        self.stdout.write(f'{"mode":<24}{"mean ms":>10}{"p50 ms":>10}{"p95 ms":>10}')
+        self.stdout.write('{:<24}{:>10.2f}{:>10.2f}{:>10.2f}'.format('new connection', *summarize(fresh)))
+        self.stdout.write('{:<24}{:>10.2f}{:>10.2f}{:>10.2f}'.format(mode, *summarize(reused)))
+        self.stdout.write(self.style.SUCCESS(f'Saved {(sum(fresh) - sum(reused)) / iterations * 1000:.2f}ms per request.'))
@@ -0,0 +1,45 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import translation
+from .benchmark_connections import summarize
+
+class Command(BaseCommand):
+    help = (
+        'Measures the middleware overhead on an API route with the full stack '
+        'against the lean stack used for API_PATH_PREFIXES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='Requests to send in each mode.')
+        parser.add_argument('--path', help='Path to request. Defaults to the JWKS endpoint, which touches neither the database nor the token cache.')
+
+    def handle(self, *args, iterations, path, **options):
+        with translation.override(settings.LANGUAGE_CODE):
+            path = path or reverse('jwks')
+
+        results = []
+
+        for mode, prefixes in (('full stack', ()), ('lean stack', settings.API_PATH_PREFIXES)):
+            with override_settings(API_PATH_PREFIXES=prefixes, ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False):
+                client = Client()
+                client.get(path)
+                timings = []
+
+                for _ in range(iterations):
+                    started_at = time.perf_counter()
+                    client.get(path)
+                    timings.append(time.perf_counter() - started_at)
+
+            results.append((mode, summarize(timings)))
+
+        self.stdout.write(f'{"mode":<24}{"mean ms":>10}{"p50 ms":>10}{"p95 ms":>10}')
+
+        for mode, summary in results:
+            self.stdout.write('{:<24}{:>10.3f}{:>10.3f}{:>10.3f}'.format(mode, *summary))
+
+        saved = results[0][1][0] - results[1][1][0]
+        self.stdout.write(self.style.SUCCESS(f'Saved {saved:.3f}ms ({saved / results[0][1][0] * 100:.0f}%) per request on {path}.'))
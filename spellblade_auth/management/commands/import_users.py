@@ -0,0 +1,176 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from spellblade_auth.models import User
+
+def read_rows(file, format):
+    """Yields the line number and fields of each user in `file`, one at a time."""
+    if format == 'csv':
+        reader = csv.DictReader(file)
+
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_num, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+
+        yield line_num, row if isinstance(row, dict) else {}
+
+class Command(BaseCommand):
+    help = (
+        'Creates users from a CSV or NDJSON file with username, email, password and '
+        'full_name fields. Rows are streamed in chunks, passwords are hashed across a '
+        'pool of processes, and each chunk is validated and inserted with a few queries. '
+        'Rejected rows are reported and skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to read, or - for stdin.')
+        parser.add_argument('--format', choices=('csv', 'ndjson'), default=None, help='Defaults to the file extension, or csv.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users validated and inserted at a time.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Processes hashing passwords.')
+
+    def handle(self, *args, path, format, chunk_size, workers, **options):
+        if format is None:
+            format = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+        try:
+            file = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as ex:
+            raise CommandError(f'Could not open {path}: {ex}')
+
+        started_at = time.monotonic()
+        self.created = self.rejected = 0
+        self.seen_usernames = set()
+        self.seen_emails = set()
+
+        # Hashing is CPU-bound and deliberately slow, so it runs in other
+        # processes while this one validates and inserts the previous chunk.
+        with file, ProcessPoolExecutor(workers, initializer=django.setup) as executor:
+            rows = read_rows(file, format)
+            pending = None
+
+            while chunk := list(islice(rows, chunk_size)):
+                users = self.validate(chunk)
+                hashes = executor.map(make_password, [password for user, password in users], chunksize=max(1, len(users) // workers))
+
+                if pending is not None:
+                    self.insert(*pending)
+
+                pending = (users, hashes)
+
+            if pending is not None:
+                self.insert(*pending)
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {self.created} users, rejected {self.rejected} in {elapsed:.1f}s '
+            f'({self.created / elapsed if elapsed else 0:.0f} users/s)'
+        ))
+
+    def reject(self, line_num, message):
+        self.rejected += 1
+        self.stderr.write(f'Line {line_num}: {message}')
+
+    def validate(self, chunk):
+        """
+        Checks a chunk against the field rules, the rows before it and the
+        existing users, with one query per unique field. Returns the users to
+        create with their raw passwords.
+        """
+        candidates = []
+
+        for line_num, row in chunk:
+            username, email, full_name = (row.get(field) or '' for field in ('username', 'email', 'full_name'))
+
+            # NDJSON values can be numbers, lists or objects.
+            if not all(isinstance(value, str) for value in (username, email, full_name)):
+                self.reject(line_num, 'Username, email and full name must be strings.')
+                continue
+
+            username = User.normalize_username(username.strip())
+            email = User.objects.normalize_email(email.strip())
+
+            if not username or not User.username_validator.regex.search(username):
+                self.reject(line_num, f'Invalid username "{username}".')
+                continue
+
+            try:
+                validate_email(email)
+
+                if len(email) > User._meta.get_field('email').max_length:
+                    raise ValidationError('Too long.')
+            except ValidationError:
+                self.reject(line_num, f'Invalid email "{email}".')
+                continue
+
+            full_name = full_name.strip()
+            password = row.get('password') or None
+
+            if len(full_name) > User._meta.get_field('full_name').max_length:
+                self.reject(line_num, 'Full name is too long.')
+                continue
+
+            if password is not None and not isinstance(password, str):
+                self.reject(line_num, 'Password must be a string.')
+                continue
+
+            if username in self.seen_usernames:
+                self.reject(line_num, f'Username "{username}" appears more than once.')
+                continue
+
+            if email in self.seen_emails:
+                self.reject(line_num, f'Email "{email}" appears more than once.')
+                continue
+
+            self.seen_usernames.add(username)
+            self.seen_emails.add(email)
+            candidates.append((line_num, username, email, full_name, password))
+
+        usernames = [candidate[1] for candidate in candidates]
+        emails = [candidate[2] for candidate in candidates]
+        existing_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        existing_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        users = []
+
+        for line_num, username, email, full_name, password in candidates:
+            if username in existing_usernames:
+                self.reject(line_num, f'A user with username "{username}" already exists.')
+            elif email in existing_emails:
+                self.reject(line_num, f'A user with email "{email}" already exists.')
+            else:
+                # An empty password leaves the account without a usable one,
+                # like create_user.
+                users.append((User(username=username, email=email, full_name=full_name), password))
+
+        return users
+
+    def insert(self, users, hashes):
+        for (user, password), hashed in zip(users, hashes):
+            user.password = hashed
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for user, password in users])
+        except IntegrityError as ex:
+            # Someone else took a username or email since the chunk was validated.
+            raise CommandError(f'Import stopped after {self.created} users: {ex}')
+
+        self.created += len(users)
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+def parse_importtime(output):
+    """Returns `(module, self_us, cumulative_us)` for each line of `-X importtime` output."""
+    modules = []
+
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        modules.append((module.strip(), int(self_us), int(cumulative_us)))
+
+    return modules
+
+class Command(BaseCommand):
+    help = (
+        'Sets up Django and imports a module in a fresh interpreter under -X importtime, '
+        'then reports the slowest imports and the total per top-level package. Profiles '
+        'what a gunicorn worker loads at startup by default.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='spellblade.asgi', help='Module to import.')
+        parser.add_argument('--top', type=int, default=20, help='Modules and packages to list.')
+        parser.add_argument('--sort', choices=('self', 'cumulative'), default='cumulative', help='Time to sort modules by.')
+
+    def handle(self, *args, module, top, sort, **options):
+        if not all(part.isidentifier() for part in module.split('.')):
+            raise CommandError(f'"{module}" is not a module name.')
+
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import django; django.setup(); import {module}'],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+            capture_output=True,
+            text=True,
+        )
+
+        if result.returncode:
+            raise CommandError(f'Importing {module} failed:\n{result.stderr[-2000:]}')
+
+        modules = parse_importtime(result.stderr)
+        packages = defaultdict(int)
+
+        for name, self_us, cumulative_us in modules:
+            packages[name.split('.')[0]] += self_us
+
+        total_us = sum(self_us for name, self_us, cumulative_us in modules)
+        self.stdout.write(f'Imported {len(modules)} modules in {total_us / 1000:.0f}ms\n')
+
+        self.stdout.write(f'{"module":<60}{"self ms":>10}{"cumul. ms":>10}')
+
+        for name, self_us, cumulative_us in sorted(modules, key=lambda row: row[1 if sort == 'self' else 2], reverse=True)[:top]:
+            self.stdout.write(f'{name:<60}{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}')
+
+        self.stdout.write(f'\n{"package":<60}{"self ms":>10}')
+
+        for name, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            self.stdout.write(f'{name:<60}{self_us / 1000:>10.1f}')
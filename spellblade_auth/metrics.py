@@ -0,0 +1,29 @@
+from .cache import outstanding_token_cache, user_cache
+from .pools import login_pool
+
+def collect():
+    pool = login_pool.stats()
+    tokens = outstanding_token_cache.stats()
+    users = user_cache.stats()
+
+    return [
+        ('spellblade_login_pool_workers', 'gauge', 'Threads in the login pool.', [((), pool['max_workers'])]),
+        ('spellblade_login_pool_queued', 'gauge', 'Logins waiting for a login pool thread.', [((), pool['queued'])]),
+        ('spellblade_login_pool_running', 'gauge', 'Logins being hashed on the login pool.', [((), pool['running'])]),
+        ('spellblade_login_pool_completed_total', 'counter', 'Logins hashed on the login pool.', [((), pool['completed'])]),
+        ('spellblade_login_pool_rejected_total', 'counter', 'Logins rejected because the login pool was full.', [((), pool['rejected'])]),
+        ('spellblade_login_pool_wait_seconds_total', 'counter', 'Time logins spent waiting for a login pool thread.', [((), pool['wait_seconds'])]),
+        ('spellblade_login_pool_run_seconds_total', 'counter', 'Time spent hashing on the login pool.', [((), pool['run_seconds'])]),
+        ('spellblade_login_pool_run_seconds_max', 'gauge', 'Longest hash on the login pool.', [((), pool['max_run_seconds'])]),
+        ('spellblade_outstanding_token_cache_size', 'gauge', 'Entries in the outstanding token cache.', [((), tokens['size'])]),
+        ('spellblade_outstanding_token_cache_lookups_total', 'counter', 'Outstanding token lookups by outcome.', [
+            ((('result', 'hit'),), tokens['hits']),
+            ((('result', 'miss'),), tokens['misses']),
+            ((('result', 'filtered'),), tokens['filtered']),
+        ]),
+        ('spellblade_user_cache_size', 'gauge', 'Entries in the user cache.', [((), users['size'])]),
+        ('spellblade_user_cache_lookups_total', 'counter', 'User cache lookups by outcome.', [
+            ((('result', 'hit'),), users['hits']),
+            ((('result', 'miss'),), users['misses']),
+        ]),
+    ]
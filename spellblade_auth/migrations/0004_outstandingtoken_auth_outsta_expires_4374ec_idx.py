@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:07
+
+from django.db import migrations, models
+from spellblade.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('spellblade_auth', '0003_alter_outstandingtoken_options_alter_user_options_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='outstandingtoken',
+            index=models.Index(fields=['expires_at'], name='auth_outsta_expires_4374ec_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spellblade_auth', '0004_outstandingtoken_auth_outsta_expires_4374ec_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outstandingtoken',
+            name='generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='token_generation',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented to revoke every token issued to this user.', verbose_name='token generation'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+from spellblade.operations import RunVendorSQL
+
+# The admin searches these columns with `UPPER(col::text) LIKE UPPER(%s)`,
+# which only a trigram index on the same expression can serve.
+COLUMNS = [
+    ('auth_user', 'username'),
+    ('auth_user', 'email'),
+    ('auth_user', 'full_name'),
+]
+
+POSTGRESQL_FORWARDS = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    *(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_{column}_trgm_idx ON {table} USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        for table, column in COLUMNS
+    ),
+]
+
+POSTGRESQL_BACKWARDS = [
+    f'DROP INDEX CONCURRENTLY IF EXISTS {table}_{column}_trgm_idx' for table, column in COLUMNS
+]
+
+class Migration(migrations.Migration):
+    # The indexes are built without locking writes, which can't happen in a
+    # transaction. A build that fails leaves an invalid index behind, which has
+    # to be dropped before migrating again.
+    atomic = False
+
+    dependencies = [
+        ('spellblade_auth', '0005_outstandingtoken_generation_user_token_generation'),
+    ]
+
+    operations = [
+        RunVendorSQL(
+            {'postgresql': POSTGRESQL_FORWARDS},
+            {'postgresql': POSTGRESQL_BACKWARDS},
+        ),
+    ]
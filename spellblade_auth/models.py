@@ -41,6 +41,12 @@ class User(AbstractUser):
     last_name = None
     full_name = models.CharField(_('full name'), max_length=150, blank=True)
     email = models.EmailField(_('email address'), unique=True)
+    token_generation = models.PositiveIntegerField(
+        _('token generation'),
+        default=0,
+        editable=False,
+        help_text=_('Incremented to revoke every token issued to this user.'),
+    )
 
     def get_short_name(self):
         return self.full_name
@@ -56,6 +62,7 @@ class User(AbstractUser):
 class OutstandingToken(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     token = models.CharField(max_length=40) # SHA-1
+    generation = models.PositiveIntegerField(default=0)
     expires_at = models.DateTimeField()
 
     class Meta:
@@ -64,7 +71,8 @@ class OutstandingToken(models.Model):
         verbose_name_plural = _('Outstanding Tokens')
 
         indexes = [
-            models.Index(fields=['token'])
+            models.Index(fields=['token']),
+            models.Index(fields=['expires_at']),
         ]
 
     def __str__(self):
@@ -0,0 +1,130 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+class PoolSaturated(Exception):
+    def __init__(self, pool):
+        super().__init__(f'The {pool.name} pool is saturated.')
+        self.retry_after = pool.retry_after
+
+class BoundedPool:
+    """
+    Thread pool with admission control for CPU-bound work such as password hashing.
+
+    At most `max_workers` calls run at once and at most `max_queue` more may wait
+    for a worker. Anything beyond that is rejected immediately with `PoolSaturated`
+    instead of queueing behind the work already in flight. Workers recycle their
+    database connections around each call the same way request threads do, and
+    each call runs in a copy of the caller's context. The executor is created
+    lazily and discarded in forked children, so the pool is safe to build before
+    a pre-forking server forks its workers.
+    """
+
+    def __init__(self, name, max_workers, max_queue, retry_after):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._executor = None
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=f'{self.name}-pool')
+            return self._executor
+
+    def _submit(self, fn, args, kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            logger.warning('%s pool saturated: %d running, %d queued', self.name, self.running, self.queued)
+            raise PoolSaturated(self)
+
+        with self._lock:
+            self.queued += 1
+
+        try:
+            # Run in a copy of the caller's context, as asgiref's sync_to_async
+            # does, so the request ID, query metrics and replica pin follow the
+            # work onto the pool thread.
+            return self._get_executor().submit(
+                contextvars.copy_context().run, self._call, time.perf_counter(), fn, args, kwargs,
+            )
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            self._slots.release()
+            raise
+
+    def _call(self, submitted_at, fn, args, kwargs):
+        started_at = time.perf_counter()
+
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+
+        try:
+            close_old_connections()
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+            finished_at = time.perf_counter()
+
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.wait_seconds += started_at - submitted_at
+                self.run_seconds += finished_at - started_at
+                self.max_run_seconds = max(self.max_run_seconds, finished_at - started_at)
+
+            self._slots.release()
+
+            logger.debug(
+                '%s pool: waited %.1fms, ran %.1fms',
+                self.name, (started_at - submitted_at) * 1000, (finished_at - started_at) * 1000,
+            )
+
+    def run(self, fn, *args, **kwargs):
+        return self._submit(fn, args, kwargs).result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'queued': self.queued,
+                'running': self.running,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'wait_seconds': self.wait_seconds,
+                'run_seconds': self.run_seconds,
+                'max_run_seconds': self.max_run_seconds,
+            }
+
+login_pool = BoundedPool(
+    'login',
+    max_workers=settings.LOGIN_POOL_WORKERS,
+    max_queue=settings.LOGIN_POOL_QUEUE,
+    retry_after=settings.LOGIN_POOL_RETRY_AFTER,
+)
@@ -1,13 +1,14 @@
 from hashlib import sha1
 from django.conf import settings
 from django.contrib.auth import authenticate
-from django.contrib.auth.models import update_last_login
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
-from .models import OutstandingToken
+from .buffers import last_login_buffer
+from .cache import outstanding_token_cache
+from .pools import login_pool
+from .tokens import RefreshToken, get_token_generation
 
 UPDATE_LAST_LOGIN = settings.SIMPLE_JWT.get('UPDATE_LAST_LOGIN', False)
 ROTATE_REFRESH_TOKENS = settings.SIMPLE_JWT.get('ROTATE_REFRESH_TOKENS', False)
@@ -22,7 +23,7 @@ class LoginSerializer(serializers.Serializer):
     access_exp = serializers.DateTimeField(read_only=True)
 
     def validate(self, attrs):
-        self.user = authenticate(username=attrs['username'], password=attrs['password'])
+        self.user = login_pool.run(authenticate, username=attrs['username'], password=attrs['password'])
 
         if not self.user:
             raise serializers.ValidationError(_('Invalid credentials'))
@@ -39,14 +40,14 @@ class LoginSerializer(serializers.Serializer):
         self.refresh = str(refresh)
         self.access = str(access)
 
-        OutstandingToken.objects.create(
+        outstanding_token_cache.create(
             user=self.user,
-            token=sha1(self.refresh.encode('utf-8')).hexdigest(),
+            digest=sha1(self.refresh.encode('utf-8')).hexdigest(),
             expires_at=self.refresh_exp
         )
 
         if UPDATE_LAST_LOGIN:
-            update_last_login(None, self.user)
+            last_login_buffer.record(self.user)
 
         return self
 
@@ -65,23 +66,32 @@ class LoginRenewSerializer(serializers.Serializer):
         except TokenError as e:
             raise serializers.ValidationError(e)
 
-        try:
-            self.outstanding_token = OutstandingToken.objects.get(token=sha1(attrs['token'].encode('utf-8')).hexdigest())
-        except OutstandingToken.DoesNotExist:
+        self.digest = sha1(attrs['token'].encode('utf-8')).hexdigest()
+        self.outstanding_token = outstanding_token_cache.get(self.digest, self.token_obj)
+
+        if not self.outstanding_token or self.outstanding_token.generation != get_token_generation(self.token_obj):
             raise serializers.ValidationError(_('Token is invalid.'))
 
         return attrs
 
     def create(self, validated_data):
         if ROTATE_REFRESH_TOKENS:
-            self.token_obj = RefreshToken.for_user(self.outstanding_token.user)
+            self.token_obj.set_jti()
+            self.token_obj.set_exp()
+            self.token_obj.set_iat()
 
             self.refresh_exp = timezone.make_aware(timezone.datetime.fromtimestamp(self.token_obj['exp']))
             self.refresh = str(self.token_obj)
 
-            self.outstanding_token.token = sha1(self.refresh.encode('utf-8')).hexdigest()
-            self.outstanding_token.expires_at = self.refresh_exp
-            self.outstanding_token.save()
+            rotated = outstanding_token_cache.rotate(
+                self.outstanding_token,
+                digest=self.digest,
+                new_digest=sha1(self.refresh.encode('utf-8')).hexdigest(),
+                expires_at=self.refresh_exp
+            )
+
+            if not rotated:
+                raise serializers.ValidationError(_('Token is invalid.'))
 
         access = self.token_obj.access_token
 
@@ -94,13 +104,22 @@ class LogoutSerializer(serializers.Serializer):
     token = serializers.CharField(write_only=True)
 
     def validate(self, attrs):
+        attrs['token'] = attrs['token'].strip()
         try:
-            self.outstanding_token = OutstandingToken.objects.get(token=sha1(attrs['token'].strip().encode('utf-8')).hexdigest())
-        except OutstandingToken.DoesNotExist:
+            token_obj = RefreshToken(attrs['token'])
+        except TokenError as e:
+            raise serializers.ValidationError(e)
+
+        self.digest = sha1(attrs['token'].encode('utf-8')).hexdigest()
+        self.outstanding_token = outstanding_token_cache.get(self.digest, token_obj)
+
+        if not self.outstanding_token:
             raise serializers.ValidationError(_('Token is invalid.'))
 
         return attrs
 
     def create(self, validated_data):
-        self.outstanding_token.delete()
+        if not outstanding_token_cache.delete(self.outstanding_token, self.digest):
+            raise serializers.ValidationError(_('Token is invalid.'))
+
         return self
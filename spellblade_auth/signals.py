@@ -0,0 +1,29 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .cache import user_cache
+from .models import User
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def evict_user_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+
+    if not reverse:
+        user_cache.invalidate(instance.pk)
+    elif pk_set is None:
+        user_cache.invalidate()
+    else:
+        for pk in pk_set:
+            user_cache.invalidate(pk)
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def evict_group_permissions(sender, action, **kwargs):
+    if action.startswith('post_'):
+        user_cache.invalidate()
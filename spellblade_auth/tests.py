@@ -1,3 +1,653 @@
-from rest_framework.test import APITestCase
+from datetime import timedelta
+from hashlib import sha1
+from io import StringIO
+import json
+import logging
+import os
+import tempfile
+import time
+from unittest import mock
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APISimpleTestCase, APITestCase, APITransactionTestCase
 from rest_framework.reverse import reverse
 from rest_framework import status
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenBackendError
+from spellblade.admin import EstimatedCountPaginator
+from spellblade.log import JsonFormatter, RequestIdFilter, current_request_id
+from spellblade.metrics import RequestStats, current_request, mark_process_dead, record_query, registry
+from spellblade.routers import ReplicaPin, ReplicaRouter, apply_user_pin, current_pin, get_pin_key
+from spellblade.warmup import warm_up
+from spellblade_core.models import Project
+from .admin import OutstandingTokenAdmin
+from .models import User, OutstandingToken
+from .authentication import JWTAuthentication
+from .buffers import LastLoginBuffer
+from .keys import RotatingTokenBackend, SigningKey
+from .cache import BloomFilter, OutstandingTokenCache, outstanding_token_cache, user_cache, user_versions
+from .pools import BoundedPool, PoolSaturated, login_pool
+from .throttling import LoginUsernameThrottle
+from .tokens import RefreshToken
+
+class LoginTests(APITransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+
+    def test_login(self):
+        response = self.client.post(reverse('login'), {'username': 'wizard', 'password': 'correct horse'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('refresh', response.data)
+        self.assertIn('access', response.data)
+        self.assertEqual(OutstandingToken.objects.filter(user=self.user).count(), 1)
+
+    def test_login_invalid_credentials(self):
+        response = self.client.post(reverse('login'), {'username': 'wizard', 'password': 'wrong'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(OutstandingToken.objects.exists())
+
+    def test_login_pool_saturated(self):
+        with mock.patch('spellblade_auth.pools.BoundedPool._submit', side_effect=PoolSaturated(BoundedPool('test', 1, 0, 7))):
+            response = self.client.post(reverse('login'), {'username': 'wizard', 'password': 'correct horse'})
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '7')
+
+@override_settings(LOGIN_THROTTLE_IP_RATE='3/min', LOGIN_THROTTLE_USERNAME_RATE='2/min')
+@mock.patch('spellblade_auth.serializers.authenticate', return_value=None)
+class LoginThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def login(self, username, ip='10.0.0.1'):
+        return self.client.post(reverse('login'), {'username': username, 'password': 'wrong'}, REMOTE_ADDR=ip)
+
+    def test_limits_by_ip_before_authenticating(self, authenticate):
+        for username in ('wizard', 'witch', 'merlin'):
+            self.assertEqual(self.login(username).status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.assertNumQueries(0):
+            response = self.login('morgana')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(authenticate.call_count, 3)
+        self.assertEqual(self.login('morgana', ip='10.0.0.2').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_limits_by_username_across_ips(self, authenticate):
+        self.login('wizard', ip='10.0.0.1')
+        self.login('wizard', ip='10.0.0.2')
+
+        self.assertEqual(self.login('Wizard', ip='10.0.0.3').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(authenticate.call_count, 2)
+
+    def test_window_slides(self, authenticate):
+        throttle = LoginUsernameThrottle()
+        request = mock.Mock(data={'username': 'wizard'})
+
+        def allow_at(now):
+            throttle.timer = lambda: now
+            return throttle.allow_request(request, None)
+
+        self.assertTrue(allow_at(59))
+        self.assertTrue(allow_at(59))
+        self.assertFalse(allow_at(60))
+
+        # A quarter into the next window, the previous one counts for 1.5.
+        self.assertTrue(allow_at(75))
+        self.assertFalse(allow_at(80))
+        self.assertAlmostEqual(throttle.wait(), 10)
+        self.assertTrue(allow_at(91))
+
+class TokenTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.refresh = RefreshToken.for_user(self.user)
+        outstanding_token_cache.create(
+            user=self.user,
+            digest=sha1(str(self.refresh).encode('utf-8')).hexdigest(),
+            expires_at=timezone.now() + timedelta(days=1),
+        )
+
+    def test_renew_rotates_token(self):
+        response = self.client.post(reverse('login_renew'), {'token': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['refresh'], str(self.refresh))
+
+        response = self.client.post(reverse('login_renew'), {'token': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_renew_rejects_token_revoked_elsewhere(self):
+        outstanding_token_cache.get(sha1(str(self.refresh).encode('utf-8')).hexdigest(), self.refresh)
+        OutstandingToken.objects.filter(user=self.user).delete()
+
+        response = self.client.post(reverse('login_renew'), {'token': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @mock.patch('spellblade_auth.serializers.ROTATE_REFRESH_TOKENS', False)
+    def test_renew_rejects_token_revoked_by_another_worker(self):
+        outstanding_token_cache.get(sha1(str(self.refresh).encode('utf-8')).hexdigest(), self.refresh)
+
+        # Another worker revokes the user, leaving this process's entry behind.
+        User.objects.filter(pk=self.user.pk).update(token_generation=F('token_generation') + 1)
+        user_versions.bump(self.user.pk)
+
+        response = self.client.post(reverse('login_renew'), {'token': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_logout(self):
+        response = self.client.post(reverse('logout'), {'token': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(OutstandingToken.objects.exists())
+
+        response = self.client.post(reverse('logout'), {'token': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_logout_all(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('logout_all'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_generation, 1)
+
+        response = self.client.post(reverse('logout_all'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials()
+        response = self.client.post(reverse('login_renew'), {'token': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=100, error_rate=0.01)
+        digest = sha1(b'token').hexdigest()
+        bloom.add(digest)
+
+        self.assertIn(digest, bloom)
+        self.assertNotIn(sha1(b'other').hexdigest(), bloom)
+
+    @mock.patch('spellblade_auth.cache.connection')
+    def test_bloom_filter_is_shared(self, connection):
+        cache.clear()
+        workers = [OutstandingTokenCache(10, 60, 100, 0.01, 300, user_versions) for i in range(2)]
+        snapshot = (time.time(), BloomFilter(capacity=100, error_rate=0.01))
+
+        with mock.patch.object(OutstandingTokenCache, '_build_filter', return_value=snapshot) as build_filter:
+            for worker in workers:
+                worker._refresh_filter()
+
+        build_filter.assert_called_once()
+        self.assertIsNotNone(workers[1].stats()['filter_age'])
+
+class PurgeExpiredTokensTests(APITestCase):
+    def test_purges_only_expired_tokens(self):
+        user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        now = timezone.now()
+
+        OutstandingToken.objects.bulk_create(
+            [OutstandingToken(user=user, token=f'{i:040x}', expires_at=now - timedelta(days=1)) for i in range(5)]
+            + [OutstandingToken(user=user, token='f' * 40, expires_at=now + timedelta(days=1))]
+        )
+
+        call_command('purge_expired_tokens', batch_size=2, sleep=0, stdout=StringIO())
+
+        self.assertQuerySetEqual(OutstandingToken.objects.values_list('token', flat=True), ['f' * 40])
+
+    def test_purges_revoked_tokens(self):
+        user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse', token_generation=2)
+
+        OutstandingToken.objects.bulk_create([
+            OutstandingToken(user=user, token='e' * 40, generation=1, expires_at=timezone.now() + timedelta(days=1)),
+            OutstandingToken(user=user, token='f' * 40, generation=2, expires_at=timezone.now() + timedelta(days=1)),
+        ])
+
+        call_command('purge_expired_tokens', sleep=0, stdout=StringIO())
+
+        self.assertQuerySetEqual(OutstandingToken.objects.values_list('token', flat=True), ['f' * 40])
+
+class ImportUsersTests(APITestCase):
+    def import_users(self, content, suffix, **options):
+        stdout, stderr = StringIO(), StringIO()
+
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, encoding='utf-8') as file:
+            file.write(content)
+            file.flush()
+            call_command('import_users', file.name, workers=1, stdout=stdout, stderr=stderr, **options)
+
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_imports_csv_and_rejects_invalid_rows(self):
+        User.objects.create_user(username='merlin', email='merlin@example.com', password='correct horse')
+
+        stdout, stderr = self.import_users(
+            'username,email,password,full_name\n'
+            'wizard,wizard@example.com,correct horse,Wizard\n'
+            'witch,witch@example.com,,\n'
+            '9lives,cat@example.com,secret,\n'
+            'sorcerer,not-an-email,secret,\n'
+            'wizard,other@example.com,secret,\n'
+            'merlin,merlin2@example.com,secret,\n'
+            'mage,merlin@example.com,secret,\n',
+            '.csv',
+            chunk_size=2,
+        )
+
+        self.assertIn('Created 2 users, rejected 5', stdout)
+        self.assertEqual(stderr.count('Line '), 5)
+        self.assertIn('Line 4: Invalid username', stderr)
+
+        wizard = User.objects.get(username='wizard')
+        self.assertTrue(wizard.check_password('correct horse'))
+        self.assertEqual(wizard.full_name, 'Wizard')
+        self.assertFalse(User.objects.get(username='witch').has_usable_password())
+
+    def test_imports_ndjson(self):
+        stdout, stderr = self.import_users(
+            '{"username": "wizard", "email": "wizard@example.com", "password": "correct horse"}\n'
+            '\n'
+            '{"username": "witch", "email": "witch@example.com", "password": 42}\n'
+            '{"username": 7, "email": "seven@example.com"}\n'
+            '{"username": "mage", "email": ["mage@example.com"]}\n'
+            'not json\n',
+            '.ndjson',
+        )
+
+        self.assertIn('Created 1 users, rejected 4', stdout)
+        self.assertIn('Line 4: Username, email and full name must be strings.', stderr)
+        self.assertTrue(User.objects.get(username='wizard').check_password('correct horse'))
+
+def generate_signing_key():
+    pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return SigningKey('RS256', pem)
+
+class RotatingTokenBackendTests(APITestCase):
+    def test_verifies_tokens_signed_with_fallback_keys(self):
+        old, new = generate_signing_key(), generate_signing_key()
+        token = RotatingTokenBackend('RS256', [old]).encode({'user_id': 1})
+        backend = RotatingTokenBackend('RS256', [new, old])
+
+        self.assertEqual(backend.decode(token)['user_id'], 1)
+        self.assertEqual(backend.decode(backend.encode({'user_id': 2}))['user_id'], 2)
+        self.assertEqual([key['kid'] for key in backend.jwks()['keys']], [new.kid, old.kid])
+
+    def test_rejects_unknown_keys(self):
+        token = RotatingTokenBackend('RS256', [generate_signing_key()]).encode({'user_id': 1})
+
+        with self.assertRaises(TokenBackendError):
+            RotatingTokenBackend('RS256', [generate_signing_key()]).decode(token)
+
+    def test_jwks_endpoint(self):
+        response = self.client.get(reverse('jwks'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'keys': []})
+        self.assertIn('max-age=', response['Cache-Control'])
+
+class MetricsTests(APITestCase):
+    def test_metrics_record_auth_views(self):
+        self.client.post(reverse('logout'), {'token': 'garbage'})
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('spellblade_http_request_duration_seconds_count{view="logout"', response.content.decode())
+        self.assertIn('view="logout",method="POST",status="400"', response.content.decode())
+        self.assertIn('spellblade_login_pool_rejected_total', response.content.decode())
+
+    def test_metrics_sum_across_processes(self):
+        labels = [['view', 'logout'], ['method', 'POST'], ['status', 400]]
+        other = {
+            'pid': 1,
+            'histograms': {'queries': [[labels, [0, 2, 0, 0, 0, 0, 0, 0, 0, 0], 2.0]]},
+            'collectors': [
+                ['spellblade_login_pool_rejected_total', 'counter', 'Logins rejected because the login pool was full.', [[[], 3]]],
+                ['spellblade_login_pool_queued', 'gauge', 'Logins waiting for a login pool thread.', [[[], 4]]],
+            ],
+        }
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            with open(f'{directory}/1-abcd.json', 'w') as f:
+                json.dump(other, f)
+
+            registry.reset()
+            self.client.post(reverse('logout'), {'token': 'garbage'})
+            content = self.client.get(reverse('metrics')).content.decode()
+
+            self.assertIn('spellblade_http_request_queries_count{view="logout",method="POST",status="400"} 3', content)
+            self.assertIn(f'spellblade_login_pool_rejected_total {login_pool.rejected + 3}', content)
+            self.assertIn('spellblade_login_pool_queued{pid="1"} 4', content)
+            self.assertIn(f'spellblade_login_pool_queued{{pid="{os.getpid()}"}} 0', content)
+
+            mark_process_dead(1, directory)
+            content = self.client.get(reverse('metrics')).content.decode()
+
+            self.assertIn(f'spellblade_login_pool_rejected_total {login_pool.rejected + 3}', content)
+            self.assertNotIn('spellblade_login_pool_queued{pid="1"}', content)
+
+    def test_counts_queries_once_after_reconnecting(self):
+        for i in range(5):
+            connection_created.send(sender=type(connection), connection=connection)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+
+        try:
+            User.objects.exists()
+        finally:
+            current_request.reset(token)
+
+        self.assertEqual(connection.execute_wrappers.count(record_query), 1)
+        self.assertEqual(stats.queries, 1)
+
+    def test_metrics_forbidden_outside_allowed_ips(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.1')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class RequestLogTests(APITestCase):
+    def test_logs_request_with_id(self):
+        with self.assertLogs('spellblade.request', logging.INFO) as logs:
+            response = self.client.post(reverse('logout'), {'token': 'garbage'}, headers={'X-Request-ID': 'abc-123'})
+
+        self.assertEqual(response['X-Request-ID'], 'abc-123')
+        self.assertEqual(logs.records[0].route, 'logout')
+        self.assertEqual(logs.records[0].status, status.HTTP_400_BAD_REQUEST)
+
+    def test_replaces_malformed_request_id(self):
+        response = self.client.post(reverse('logout'), {'token': 'garbage'}, headers={'X-Request-ID': 'a b\nc'})
+
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_json_formatter(self):
+        record = logging.makeLogRecord({'name': 'test', 'levelname': 'INFO', 'msg': 'hello %s', 'args': ('world',), 'route': 'login'})
+        RequestIdFilter().filter(record)
+
+        self.assertEqual(
+            {key: value for key, value in json.loads(JsonFormatter().format(record)).items() if key != 'time'},
+            {'level': 'INFO', 'logger': 'test', 'message': 'hello world', 'request_id': None, 'route': 'login'},
+        )
+
+class StartupTests(APISimpleTestCase):
+    def test_warm_up_binds_serializers(self):
+        with self.assertLogs('spellblade.warmup', 'INFO') as logs:
+            warm_up()
+
+        self.assertRegex(logs.output[0], r'Warmed up [1-9]\d* serializers')
+
+    def test_profile_imports(self):
+        stdout = StringIO()
+
+        call_command('profile_imports', top=5, stdout=stdout)
+
+        self.assertRegex(stdout.getvalue(), r'Imported \d+ modules')
+        self.assertRegex(stdout.getvalue(), r'\ndjango +\d')
+
+class LeanMiddlewareTests(APITestCase):
+    def test_api_skips_admin_middleware(self):
+        response = self.client.get(reverse('jwks'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('X-Frame-Options'))
+        self.assertFalse(response.has_header('Content-Language'))
+
+    def test_admin_keeps_full_stack(self):
+        response = self.client.get(reverse('admin:login'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_benchmark_runs(self):
+        stdout = StringIO()
+
+        call_command('benchmark_middleware', iterations=5, stdout=stdout)
+
+        self.assertIn('lean stack', stdout.getvalue())
+
+class AdminChangelistTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='secret')
+        self.client.force_login(self.admin)
+
+    def create_tokens(self, count):
+        for i in range(User.objects.count(), User.objects.count() + count):
+            user = User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='secret')
+            OutstandingToken.objects.create(user=user, token=sha1(user.username.encode()).hexdigest(), expires_at=timezone.now())
+
+    def get_changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:spellblade_auth_outstandingtoken_changelist'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.create_tokens(2)
+        queries = self.get_changelist_queries()
+
+        self.create_tokens(10)
+
+        self.assertEqual(self.get_changelist_queries(), queries)
+
+    def test_selects_related_from_list_display(self):
+        model_admin = OutstandingTokenAdmin(OutstandingToken, None)
+
+        self.assertEqual(model_admin.get_list_select_related(None), ['user'])
+
+    def test_counts_exactly_without_estimate(self):
+        paginator = EstimatedCountPaginator(User.objects.order_by('pk'), 10)
+
+        self.assertEqual(paginator.count, 1)
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(APISimpleTestCase):
+    def test_routes_reads_to_replica(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Project), 'replica')
+        self.assertEqual(ReplicaRouter().db_for_write(Project), 'default')
+
+    def test_pins_to_primary_after_write(self):
+        pin = ReplicaPin(False)
+        token = current_pin.set(pin)
+
+        try:
+            self.assertEqual(ReplicaRouter().db_for_read(Project), 'replica')
+            ReplicaRouter().db_for_write(Project)
+            self.assertEqual(ReplicaRouter().db_for_read(Project), 'default')
+        finally:
+            current_pin.reset(token)
+
+    def test_keeps_auth_reads_on_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_read(OutstandingToken), 'default')
+
+    def test_pins_to_primary_after_user_wrote(self):
+        pin = ReplicaPin(False)
+        token = current_pin.set(pin)
+
+        try:
+            with mock.patch('spellblade.routers.cache') as cache:
+                cache.get.return_value = True
+                apply_user_pin(1)
+
+            cache.get.assert_called_once_with('replica_pin:1')
+            self.assertEqual(ReplicaRouter().db_for_read(Project), 'default')
+        finally:
+            current_pin.reset(token)
+
+class ReplicaPinMiddlewareTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.client.force_authenticate(self.user)
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_pins_user_after_write(self):
+        response = self.client.post(reverse('logout_all'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIs(cache.get(get_pin_key(self.user.pk)), True)
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_no_pin_without_write(self):
+        response = self.client.get(reverse('jwks'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(cache.get(get_pin_key(self.user.pk)))
+
+class JWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.invalidate()
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.access = RefreshToken.for_user(self.user).access_token
+
+    def test_caches_user(self):
+        with self.assertNumQueries(1):
+            JWTAuthentication().get_user(self.access)
+
+        with self.assertNumQueries(0):
+            user = JWTAuthentication().get_user(self.access)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.username, 'wizard')
+
+    def test_save_evicts_user(self):
+        JWTAuthentication().get_user(self.access)
+
+        self.user.full_name = 'Merlin'
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            user = JWTAuthentication().get_user(self.access)
+
+        self.assertEqual(user.full_name, 'Merlin')
+
+    def test_save_survives_shared_cache_outage(self):
+        self.user.full_name = 'Merlin'
+
+        with mock.patch('spellblade_auth.cache.shared_cache.incr', side_effect=ConnectionError):
+            with self.assertLogs('spellblade_auth.cache', 'WARNING'):
+                self.user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.full_name, 'Merlin')
+
+    def bump_elsewhere(self, **fields):
+        # Another worker writes the row and bumps the shared version, leaving
+        # this process's local entry in place.
+        User.objects.filter(pk=self.user.pk).update(**fields)
+        user_versions.bump(self.user.pk)
+
+    def test_deactivation_elsewhere_takes_effect(self):
+        JWTAuthentication().get_user(self.access)
+        self.bump_elsewhere(is_active=False)
+
+        with self.assertRaisesMessage(AuthenticationFailed, 'User is inactive'):
+            JWTAuthentication().get_user(self.access)
+
+    def test_revocation_elsewhere_takes_effect(self):
+        JWTAuthentication().get_user(self.access)
+        self.bump_elsewhere(token_generation=F('token_generation') + 1)
+
+        with self.assertRaisesMessage(AuthenticationFailed, 'Token has been revoked.'):
+            JWTAuthentication().get_user(self.access)
+
+class LastLoginBufferTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+
+    def test_flush_writes_buffered_logins(self):
+        buffer = LastLoginBuffer(interval=3600, max_size=100)
+        buffer.record(self.user)
+
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 1)
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_zero_interval_writes_immediately(self):
+        buffer = LastLoginBuffer(interval=0, max_size=100)
+        buffer.record(self.user)
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+class BenchmarkAuthTests(APITransactionTestCase):
+    databases = '__all__'
+
+    def test_benchmark_runs_and_cleans_up(self):
+        stdout = StringIO()
+
+        call_command(
+            'benchmark_auth', users=2, tokens=2, requests=2, concurrency=2,
+            interface=['wsgi', 'asgi'], endpoint=['login_renew', 'logout_all'], stdout=stdout,
+        )
+
+        self.assertEqual(stdout.getvalue().count('login_renew'), 2)
+        self.assertFalse(User.objects.exists())
+
+    def test_rejects_invalid_counts(self):
+        with self.assertRaisesMessage(CommandError, '--requests must be at least 1.'):
+            call_command('benchmark_auth', requests=0, stdout=StringIO())
+
+        with self.assertRaisesMessage(CommandError, '--tokens must be at least --requests'):
+            call_command('benchmark_auth', tokens=1, requests=2, stdout=StringIO())
+
+class BoundedPoolTests(APITestCase):
+    def test_rejects_beyond_capacity(self):
+        pool = BoundedPool('test', max_workers=1, max_queue=0, retry_after=1)
+        pool._slots.acquire()
+
+        with self.assertRaises(PoolSaturated):
+            pool.run(lambda: None)
+
+        self.assertEqual(pool.stats()['rejected'], 1)
+
+    def test_records_completed_calls(self):
+        pool = BoundedPool('test', max_workers=1, max_queue=1, retry_after=1)
+
+        self.assertEqual(pool.run(lambda x: x * 2, 21), 42)
+        self.assertEqual(pool.stats()['completed'], 1)
+        self.assertEqual(pool.stats()['queued'], 0)
+
+    def test_runs_in_callers_context(self):
+        pool = BoundedPool('test', max_workers=1, max_queue=1, retry_after=1)
+        pin = ReplicaPin(False)
+        pin_token = current_pin.set(pin)
+        request_id_token = current_request_id.set('abc')
+
+        try:
+            self.assertEqual(pool.run(lambda: (current_request_id.get(), current_pin.get())), ('abc', pin))
+            pool.run(ReplicaRouter().db_for_write, Project)
+            self.assertTrue(pin.wrote)
+        finally:
+            current_request_id.reset(request_id_token)
+            current_pin.reset(pin_token)
@@ -0,0 +1,87 @@
+from hashlib import sha1
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Rate limit kept in the default cache, so every worker shares it.
+
+    Requests are counted in fixed windows, and the sliding window is estimated
+    from the current count plus the previous one weighted by how much of it
+    still overlaps. Each check takes its slot with an atomic `incr` and
+    decides on the count it returns, so concurrent workers can't all take the
+    last one, where DRF's read-modify-write of a list of timestamps would let
+    them overwrite each other. Rejected requests give their slot back.
+
+    The rate is read from the setting named by `rate_setting`; `None`
+    disables the throttle.
+    """
+
+    rate_setting = None
+
+    def get_rate(self):
+        return getattr(settings, self.rate_setting)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+
+        if self.key is None:
+            return True
+
+        window, offset = divmod(self.timer(), self.duration)
+        current_key = f'{self.key}_{int(window)}'
+        previous_key = f'{self.key}_{int(window) - 1}'
+
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # Another worker may start the window between these two calls.
+            current = 1 if self.cache.add(current_key, 1, 2 * self.duration) else self.cache.incr(current_key)
+
+        previous = self.cache.get(previous_key, 0)
+
+        # The count now includes this request; the ones before it decide.
+        current -= 1
+
+        if previous * (1 - offset / self.duration) + current >= self.num_requests:
+            try:
+                self.cache.decr(current_key)
+            except ValueError:
+                pass
+
+            if current >= self.num_requests:
+                self.wait_seconds = self.duration - offset
+            else:
+                # Wait until enough of the previous window has slid out.
+                self.wait_seconds = self.duration * (1 - (self.num_requests - current) / previous) - offset
+            return False
+
+        return True
+
+    def wait(self):
+        return max(self.wait_seconds, 0)
+
+class LoginIPThrottle(SlidingWindowRateThrottle):
+    scope = 'login_ip'
+    rate_setting = 'LOGIN_THROTTLE_IP_RATE'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+class LoginUsernameThrottle(SlidingWindowRateThrottle):
+    """Limits attempts against one account, however many addresses they come from."""
+
+    scope = 'login_username'
+    rate_setting = 'LOGIN_THROTTLE_USERNAME_RATE'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+
+        if not isinstance(username, str) or not username:
+            return None
+
+        ident = sha1(username.casefold().encode('utf-8')).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -0,0 +1,28 @@
+from rest_framework_simplejwt.tokens import AccessToken as BaseAccessToken, RefreshToken as BaseRefreshToken
+from .keys import token_backend
+
+TOKEN_GENERATION_CLAIM = 'gen'
+
+class AccessToken(BaseAccessToken):
+    _token_backend = token_backend
+
+class RefreshToken(BaseRefreshToken):
+    """
+    Refresh token that carries the user's token generation.
+
+    The claim is copied into every access token derived from the refresh token,
+    so bumping `User.token_generation` revokes both at once. Tokens issued
+    before the claim existed are treated as generation 0.
+    """
+
+    access_token_class = AccessToken
+    _token_backend = token_backend
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TOKEN_GENERATION_CLAIM] = user.token_generation
+        return token
+
+def get_token_generation(token):
+    return token.get(TOKEN_GENERATION_CLAIM, 0)
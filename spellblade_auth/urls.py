@@ -4,6 +4,7 @@ from .views import (
     LoginRenewView,
     LogoutView,
     LogoutAllView,
+    JwksView,
 )
 
 urlpatterns = [
@@ -11,4 +12,5 @@ urlpatterns = [
     path('login/renew/', LoginRenewView.as_view(), name='login_renew'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('logout/all/', LogoutAllView.as_view(), name='logout_all'),
+    path('jwks/', JwksView.as_view(), name='jwks'),
 ]
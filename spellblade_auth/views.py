@@ -1,22 +1,76 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.utils.translation import gettext_lazy as _
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from .serializers import LoginSerializer, LoginRenewSerializer, LogoutSerializer
-from .models import OutstandingToken
-
-class LoginView(APIView):
+from .cache import outstanding_token_cache
+from .keys import get_jwks
+from .pools import PoolSaturated
+from .throttling import LoginIPThrottle, LoginUsernameThrottle
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines.
+
+    DRF only dispatches synchronously, so this runs authentication, permission and
+    throttle checks in a thread and awaits the handler on the event loop. Under
+    WSGI, Django runs the whole view through `async_to_sync` instead.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+class LoginView(AsyncAPIView):
     permission_classes = (AllowAny,)
+    # Checked in `initial`, before the password is hashed.
+    throttle_classes = (LoginIPThrottle, LoginUsernameThrottle)
     serializer_class = LoginSerializer
 
     def get_serializer(self):
         return self.serializer_class()
 
-    def post(self, request):
+    async def post(self, request):
         serializer = self.serializer_class(data=request.data)
 
-        if serializer.is_valid():
-            serializer.save()
+        # The password hash runs on the login pool; this thread only waits for it.
+        try:
+            is_valid = await sync_to_async(serializer.is_valid, thread_sensitive=False)()
+        except PoolSaturated as e:
+            return Response(
+                {'detail': _('Too many logins are in progress. Try again later.')},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(e.retry_after)},
+            )
+
+        if is_valid:
+            await sync_to_async(serializer.save)()
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -56,5 +110,14 @@ class LogoutView(APIView):
 class LogoutAllView(APIView):
 
     def post(self, request):
-        OutstandingToken.objects.filter(user=request.user).delete()
+        outstanding_token_cache.revoke_user(request.user)
         return Response(status=status.HTTP_200_OK)
+
+class JwksView(APIView):
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        response = Response(get_jwks(), status=status.HTTP_200_OK)
+        patch_cache_control(response, public=True, max_age=settings.JWKS_MAX_AGE)
+        return response
@@ -1 +1,35 @@
 from django.contrib import admin
+from spellblade.admin import LargeTableAdminMixin
+from .models import OutgoingEmail, Project, Section, Task
+
+@admin.register(Project)
+class ProjectAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'user',)
+    search_fields = ('name', '=user__username',)
+
+@admin.register(Section)
+class SectionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'project', 'project__user',)
+    search_fields = ('name', '^project__name', '=project__user__username',)
+
+@admin.register(Task)
+class TaskAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'section', 'section__project', 'section__project__user', 'due_at', 'recurrence',)
+    search_fields = ('name', '^section__project__name', '=section__project__user__username',)
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    ordering = ('created_at',)
+    list_display = ('subject', 'to', 'attempts', 'next_attempt_at', 'created_at')
+    search_fields = ('subject',)
+
+    actions = None
+
+    def get_readonly_fields(self, *args, **kwargs):
+        return [f.name for f in self.model._meta.fields]
+
+    def has_add_permission(self, *args, **kwargs):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return request.method in ["GET", "HEAD"] and super().has_change_permission(request, obj)
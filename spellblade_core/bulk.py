@@ -0,0 +1,124 @@
+"""Applies batches of task operations in one transaction."""
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext as _
+from .models import ChangeKind, RecurringFrequency, Section, Task
+from .sync import defer_changes
+
+TASK_FIELDS = ('name', 'description', 'due_at', 'recurrence')
+
+class BulkConflict(Exception):
+    pass
+
+def validate_task_operations(user, operations):
+    """
+    Resolves `operations` against the database in three queries and checks them
+    against the task constraints as a whole. Returns the tasks to create, update
+    and delete, and a list with the errors of each operation, or `None` for the
+    ones that are fine.
+    """
+    errors = [None] * len(operations)
+    section_ids = {operation['section'] for operation in operations if 'section' in operation}
+    task_ids = [operation['id'] for operation in operations if 'id' in operation]
+
+    sections = dict(Section.objects.filter(pk__in=section_ids, project__user=user).values_list('pk', 'project_id'))
+    tasks = Task.objects.filter(pk__in=task_ids, section__project__user=user).in_bulk()
+
+    seen = set()
+    created, updated, deleted = [], [], []
+    held = {}
+
+    for index, operation in enumerate(operations):
+        if 'id' in operation:
+            if operation['id'] not in tasks:
+                errors[index] = {'id': [_('Task not found.')]}
+                continue
+
+            if operation['id'] in seen:
+                errors[index] = {'id': [_('Each task can only appear once per batch.')]}
+                continue
+
+            seen.add(operation['id'])
+
+        if 'section' in operation and operation['section'] not in sections:
+            errors[index] = {'section': [_('Section not found.')]}
+            continue
+
+        if operation['op'] == 'delete':
+            deleted.append((index, tasks[operation['id']]))
+            continue
+
+        if operation['op'] == 'create':
+            task = Task(section_id=operation['section'])
+            created.append((index, task))
+        else:
+            task = tasks[operation['id']]
+            updated.append((index, task))
+            held[task.section_id, task.name] = task.pk
+
+        if 'section' in operation:
+            task.section_id = operation['section']
+            task.project_id = sections[operation['section']]
+            task.user_id = user.pk
+
+        for field in TASK_FIELDS:
+            if field in operation:
+                setattr(task, field, operation[field])
+
+        if task.recurrence != RecurringFrequency.NEVER and task.due_at is None:
+            errors[index] = {'due_at': [_('If the task is recurring, a due date must be set.')]}
+
+    # Names have to be unique per section once the whole batch has applied, so
+    # the tasks it touches are checked against each other and against the rest
+    # of their sections in one go.
+    changed = {task.pk for index, task in updated + deleted}
+    final = created + updated
+    names = {}
+
+    for section_id, name in (
+        Task.objects
+        .filter(section_id__in={task.section_id for index, task in final})
+        .exclude(pk__in=changed)
+        .values_list('section_id', 'name')
+    ):
+        names[section_id, name] = None
+
+    for index, task in final:
+        key = (task.section_id, task.name)
+
+        if key in names:
+            errors[index] = {'name': [_('A task with that name already exists in this section.')]}
+
+            if names[key] is not None:
+                errors[names[key]] = errors[index]
+        else:
+            names[key] = index
+
+            # The database checks names row by row as the update goes, so an
+            # updated task can't take a name another one gives up, as in a swap.
+            # New tasks are inserted afterwards and can.
+            if task.pk is not None and held.get(key, task.pk) != task.pk:
+                errors[index] = {'name': [_('Another task in this batch has that name until it applies. Rename it in a separate batch.')]}
+
+    return created, updated, deleted, errors
+
+def apply_task_operations(user, created, updated, deleted):
+    """
+    Writes the validated operations with one bulk statement per kind and records
+    their changes under a single sequence bump.
+    """
+    try:
+        with transaction.atomic(), defer_changes(user.pk) as changes:
+            # Deletes go first and creates last, so names freed up by the batch
+            # can be reused within it.
+            if deleted:
+                Task.objects.filter(pk__in=[task.pk for index, task in deleted]).delete()
+
+            if updated:
+                Task.objects.bulk_update([task for index, task in updated], ['section', 'project', *TASK_FIELDS])
+
+            Task.objects.bulk_create([task for index, task in created])
+
+            changes.extend((ChangeKind.TASK, task.pk, False) for index, task in created + updated)
+    except IntegrityError as ex:
+        # A concurrent write took a name first.
+        raise BulkConflict() from ex
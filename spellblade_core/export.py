@@ -0,0 +1,62 @@
+"""
+Exports everything stored for a user as newline-delimited JSON.
+
+Each line is one record with a `type` of user, session, project, section or
+task. Rows are read through `iterator()` in chunks of `EXPORT_CHUNK_SIZE`,
+which uses a server-side cursor on PostgreSQL, and encoded as they arrive, so
+memory stays flat however large the account is.
+"""
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from spellblade_auth.models import OutstandingToken, User
+from .models import Project, Section, Task
+
+encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+def get_export_querysets(user_id):
+    """Returns the record types to export for the user, with their rows."""
+    return (
+        ('user', User.objects.filter(pk=user_id).values(
+            'id', 'username', 'email', 'full_name', 'is_active', 'date_joined', 'last_login',
+        )),
+        # Token hashes stay out of the export, like they stay out of responses.
+        ('session', OutstandingToken.objects.filter(user_id=user_id).order_by('pk').values(
+            'id', 'generation', 'expires_at',
+        )),
+        ('project', Project.objects.filter(user_id=user_id).order_by('pk').values(
+            'id', 'name',
+        )),
+        ('section', Section.objects.filter(project__user_id=user_id).order_by('pk').values(
+            'id', 'project_id', 'name',
+        )),
+        ('task', Task.objects.filter(section__project__user_id=user_id).order_by('pk').values(
+            'id', 'section_id', 'name', 'description', 'due_at', 'recurrence',
+        )),
+    )
+
+def iter_export(user_id):
+    """
+    Yields the user's records as lines of JSON. Parents come before their
+    children; rows written while the export runs may or may not be included.
+    """
+    for kind, queryset in get_export_querysets(user_id):
+        for row in queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+            yield encoder.encode({'type': kind, **row}) + '\n'
+
+async def aiter_export(user_id):
+    """
+    `iter_export` for responses served under ASGI, which would otherwise read a
+    sync iterator to the end before sending anything. The lines are read in
+    the sync thread, `EXPORT_CHUNK_SIZE` at a time, and sent as they come.
+    """
+    lines = iter_export(user_id)
+    read = sync_to_async(lambda: ''.join(islice(lines, settings.EXPORT_CHUNK_SIZE)))
+
+    try:
+        while chunk := await read():
+            yield chunk
+    finally:
+        # Closes the cursor if the client goes away halfway through.
+        await sync_to_async(lines.close)()
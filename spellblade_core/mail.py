@@ -0,0 +1,28 @@
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+from .models import OutgoingEmail
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Queues messages in the outbox instead of sending them.
+
+    The rows are written on the default database connection, so mail sent inside
+    a transaction is only queued if it commits. `send_outbox` delivers them
+    through `OUTBOX_EMAIL_BACKEND`.
+    """
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+
+        try:
+            emails = OutgoingEmail.objects.bulk_create(
+                OutgoingEmail.from_message(message, next_attempt_at=now)
+                for message in email_messages
+                if message.recipients()
+            )
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+
+        return len(emails)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from spellblade_auth.models import User
+from spellblade_core.export import iter_export
+
+class Command(BaseCommand):
+    help = 'Writes everything stored for a user as newline-delimited JSON, streaming it in constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--output', default=None, help='File to write to instead of stdout.')
+
+    def handle(self, *args, username, output, **options):
+        try:
+            user_id = User.objects.values_list('pk', flat=True).get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'User "{username}" does not exist.')
+
+        if output is None:
+            for line in iter_export(user_id):
+                self.stdout.write(line, ending='')
+            return
+
+        with open(output, 'w', encoding='utf-8') as file:
+            file.writelines(iter_export(user_id))
+
+        self.stderr.write(self.style.SUCCESS(f'Exported {username} to {output}'))
@@ -0,0 +1,105 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from spellblade_core.models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+def get_retry_delay(attempts):
+    return min(settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_DELAY)
+
+class Command(BaseCommand):
+    help = (
+        'Delivers queued emails in batches over one reused connection, retrying '
+        'failures with exponential backoff. Runs until interrupted unless --once is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE, help='Emails claimed at a time.')
+        parser.add_argument('--interval', type=float, default=settings.OUTBOX_POLL_INTERVAL, help='Seconds to wait when the outbox is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once no emails are due instead of waiting for more.')
+
+    def handle(self, *args, batch_size, interval, once, **options):
+        connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+        sent = failed = 0
+
+        try:
+            while True:
+                close_old_connections()
+                emails = self.claim(batch_size)
+
+                if not emails:
+                    # Don't hold the SMTP connection open while there's nothing to send.
+                    connection.close()
+
+                    if once:
+                        break
+
+                    time.sleep(interval)
+                    continue
+
+                for email in emails:
+                    if self.send(connection, email):
+                        sent += 1
+                    else:
+                        failed += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails; {failed} attempts failed.'))
+
+    def claim(self, batch_size):
+        """
+        Leases a batch of due emails to this worker by pushing their next attempt
+        past `OUTBOX_LEASE`. A worker that dies mid-batch leaves the rest to be
+        retried once the lease runs out, so delivery is at least once.
+        """
+        now = timezone.now()
+
+        with transaction.atomic():
+            emails = list(
+                OutgoingEmail.objects
+                .select_for_update(skip_locked=True)
+                .filter(next_attempt_at__lte=now)
+                .order_by('next_attempt_at')[:batch_size]
+            )
+
+            OutgoingEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE),
+            )
+
+        for email in emails:
+            email.attempts += 1
+
+        return emails
+
+    def send(self, connection, email):
+        try:
+            # Opening is a no-op while the connection is up, and keeps the SMTP
+            # backend from closing it after each message.
+            connection.open()
+            connection.send_messages([email.to_message(connection)])
+        except Exception as ex:
+            connection.close()
+
+            if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                next_attempt_at = None
+                logger.error('Giving up on email %d after %d attempts: %r', email.pk, email.attempts, ex)
+            else:
+                next_attempt_at = timezone.now() + timedelta(seconds=get_retry_delay(email.attempts))
+                logger.warning('Failed to send email %d (attempt %d): %r', email.pk, email.attempts, ex)
+
+            OutgoingEmail.objects.filter(pk=email.pk).update(next_attempt_at=next_attempt_at, last_error=repr(ex))
+            return False
+
+        OutgoingEmail.objects.filter(pk=email.pk).delete()
+        return True
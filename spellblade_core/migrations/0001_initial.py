@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.TextField(blank=True, verbose_name='subject')),
+                ('body', models.TextField(blank=True, verbose_name='body')),
+                ('content_subtype', models.CharField(default='plain', max_length=32)),
+                ('from_email', models.TextField(verbose_name='from')),
+                ('to', models.JSONField(default=list, verbose_name='to')),
+                ('cc', models.JSONField(default=list)),
+                ('bcc', models.JSONField(default=list)),
+                ('reply_to', models.JSONField(default=list)),
+                ('headers', models.JSONField(default=dict)),
+                ('alternatives', models.JSONField(default=list)),
+                ('attachments', models.JSONField(default=list)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('next_attempt_at', models.DateTimeField(null=True, verbose_name='next attempt at')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'Outgoing Email',
+                'verbose_name_plural': 'Outgoing Emails',
+                'db_table': 'core_outgoing_email',
+                'indexes': [models.Index(fields=['next_attempt_at'], name='core_outgoi_next_at_455ff0_idx')],
+            },
+        ),
+    ]
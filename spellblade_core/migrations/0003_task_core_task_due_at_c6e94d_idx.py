@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spellblade_core', '0002_project_section_task_project_unique_project_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['due_at'], name='core_task_due_at_c6e94d_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spellblade_auth', '0005_outstandingtoken_generation_user_token_generation'),
+        ('spellblade_core', '0003_task_core_task_due_at_c6e94d_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'core_change_sequence',
+            },
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(choices=[('project', 'Project'), ('section', 'Section'), ('task', 'Task')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'core_change',
+                'indexes': [models.Index(fields=['user', 'seq'], name='core_change_user_id_b07c4f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_change_object')],
+            },
+        ),
+    ]
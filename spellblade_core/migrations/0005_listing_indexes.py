@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:32
+
+from django.conf import settings
+from django.db import migrations, models
+from spellblade.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('spellblade_core', '0004_changesequence_change'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(fields=['user', 'name', 'id'], name='core_projec_user_id_8fe4c7_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='section',
+            index=models.Index(fields=['project', 'name', 'id'], name='core_sectio_project_c2a023_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+from spellblade.operations import RunVendorSQL
+
+POSTGRESQL_FORWARDS = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS core_task_search_idx ON core_task USING gin ((
+        setweight(to_tsvector('english', "core_task"."name"), 'A') ||
+        setweight(to_tsvector('english', "core_task"."description"), 'B')
+    ))
+    """,
+]
+
+POSTGRESQL_BACKWARDS = [
+    'DROP INDEX CONCURRENTLY IF EXISTS core_task_search_idx',
+]
+
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE core_task_fts USING fts5(name, description, content='core_task', content_rowid='id')",
+    """
+    CREATE TRIGGER core_task_fts_insert AFTER INSERT ON core_task BEGIN
+        INSERT INTO core_task_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER core_task_fts_delete AFTER DELETE ON core_task BEGIN
+        INSERT INTO core_task_fts (core_task_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER core_task_fts_update AFTER UPDATE OF name, description ON core_task BEGIN
+        INSERT INTO core_task_fts (core_task_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO core_task_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    "INSERT INTO core_task_fts (core_task_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER IF EXISTS core_task_fts_insert',
+    'DROP TRIGGER IF EXISTS core_task_fts_delete',
+    'DROP TRIGGER IF EXISTS core_task_fts_update',
+    'DROP TABLE IF EXISTS core_task_fts',
+]
+
+class Migration(migrations.Migration):
+    # Non-atomic so the GIN index can be built without locking writes to
+    # core_task.
+    atomic = False
+
+    dependencies = [
+        ('spellblade_core', '0005_listing_indexes'),
+    ]
+
+    operations = [
+        RunVendorSQL(
+            {'postgresql': POSTGRESQL_FORWARDS, 'sqlite': SQLITE_FORWARDS},
+            {'postgresql': POSTGRESQL_BACKWARDS, 'sqlite': SQLITE_BACKWARDS},
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+from spellblade.operations import RunVendorSQL
+
+# Serves the admin's case-insensitive name searches, like the user columns in
+# spellblade_auth 0006, which also enables pg_trgm. The indexes are built
+# concurrently in the same way.
+COLUMNS = [
+    ('core_project', 'name'),
+    ('core_section', 'name'),
+    ('core_task', 'name'),
+]
+
+POSTGRESQL_FORWARDS = [
+    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_{column}_trgm_idx ON {table} USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+    for table, column in COLUMNS
+]
+
+POSTGRESQL_BACKWARDS = [
+    f'DROP INDEX CONCURRENTLY IF EXISTS {table}_{column}_trgm_idx' for table, column in COLUMNS
+]
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('spellblade_auth', '0006_user_trigram_indexes'),
+        ('spellblade_core', '0006_task_search'),
+    ]
+
+    operations = [
+        RunVendorSQL(
+            {'postgresql': POSTGRESQL_FORWARDS},
+            {'postgresql': POSTGRESQL_BACKWARDS},
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from spellblade.operations import AddIndexConcurrently, RunVendorSQL
+
+# SQLite rebuilds core_task to change its columns, which drops the triggers
+# that keep the search table from 0006 in sync, so they're put back after each
+# rebuild.
+SQLITE_SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_insert AFTER INSERT ON core_task BEGIN
+        INSERT INTO core_task_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_delete AFTER DELETE ON core_task BEGIN
+        INSERT INTO core_task_fts (core_task_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_update AFTER UPDATE OF name, description ON core_task BEGIN
+        INSERT INTO core_task_fts (core_task_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO core_task_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+def copy_owners(apps, schema_editor):
+    Section = apps.get_model('spellblade_core', 'Section')
+    Task = apps.get_model('spellblade_core', 'Task')
+    sections = Section.objects.using(schema_editor.connection.alias).filter(pk=OuterRef('section_id'))
+
+    Task.objects.using(schema_editor.connection.alias).update(
+        project_id=Subquery(sections.values('project_id')),
+        user_id=Subquery(sections.values('project__user_id')),
+    )
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('spellblade_core', '0007_name_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        RunVendorSQL({}, {'sqlite': SQLITE_SEARCH_TRIGGERS}),
+        # Added as nullable and filled in before the constraint goes on, so
+        # existing rows don't need a default.
+        migrations.AddField(
+            model_name='task',
+            name='project',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='spellblade_core.project'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(copy_owners, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='task',
+            name='project',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.DO_NOTHING, to='spellblade_core.project'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+        RunVendorSQL({'sqlite': SQLITE_SEARCH_TRIGGERS}, {}),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['project', 'due_at', 'id'], name='core_task_project_9b55d9_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_at', 'id'], name='core_task_user_id_f88d74_idx'),
+        ),
+    ]
@@ -1 +1,334 @@
-from django.db import models
+import base64
+from email.mime.base import MIMEBase
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import models, router, transaction
+from django.utils.translation import gettext_lazy as _
+
+class TrackedQuerySet(models.QuerySet):
+    def delete(self):
+        from .sync import collect_deletes, record_deletes
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            changes = collect_deletes(self)
+            deleted = super().delete()
+            record_deletes(changes)
+
+        return deleted
+
+class TrackedModel(models.Model):
+    """
+    Records a change for every save and delete in the same transaction as the
+    write, so the change log can't miss one that committed.
+
+    Deletes find the rows they cascade to with one query per level up front,
+    rather than through signals, which would make Django fetch and delete
+    every task one by one.
+    """
+
+    objects = TrackedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, using=None, **kwargs):
+        from .sync import record_save
+
+        using = using or router.db_for_write(type(self), instance=self)
+
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, using=using, **kwargs)
+            record_save(self)
+
+    def delete(self, using=None, keep_parents=False):
+        from .sync import collect_deletes, record_deletes
+
+        using = using or router.db_for_write(type(self), instance=self)
+
+        with transaction.atomic(using=using, savepoint=False):
+            changes = collect_deletes(type(self)._base_manager.using(using).filter(pk=self.pk))
+            deleted = super().delete(using=using, keep_parents=keep_parents)
+            record_deletes(changes)
+
+        return deleted
+
+class Project(TrackedModel):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    name = models.CharField(_('name'), max_length=25)
+
+    class Meta:
+        verbose_name = _('project')
+        verbose_name_plural = _('projects')
+        db_table = 'core_project'
+
+        indexes = [
+            models.Index(fields=['user', 'name', 'id']),
+        ]
+
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'name'), name='unique_project_name'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class Section(TrackedModel):
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    name = models.CharField(_('name'), max_length=25)
+
+    class Meta:
+        verbose_name = _('section')
+        verbose_name_plural = _('sections')
+        db_table = 'core_section'
+
+        indexes = [
+            models.Index(fields=['project', 'name', 'id']),
+        ]
+
+        constraints = [
+            models.UniqueConstraint(fields=('project', 'name'), name='unique_section_name'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        section = super().from_db(db, field_names, values)
+        section._loaded_project_id = section.__dict__.get('project_id')
+        return section
+
+    def save(self, *args, **kwargs):
+        moved = not self._state.adding and self.project_id != getattr(self, '_loaded_project_id', None)
+
+        using = kwargs.get('using') or router.db_for_write(Section, instance=self)
+
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+            # The tasks carry their section's project and user.
+            if moved:
+                Task._base_manager.using(using).filter(section=self).update(project_id=self.project_id, user_id=self.project.user_id)
+
+        self._loaded_project_id = self.project_id
+
+class RecurringFrequency(models.IntegerChoices):
+    NEVER = -1, _('Never')
+    EVERY_DAY = 0, _('Every day')
+    EVERY_WEEK = 1, _('Every week')
+
+def copy_owners(tasks):
+    """Sets the project and user of each task from its section, with one query."""
+    if not tasks:
+        return
+
+    owners = {
+        pk: (project_id, user_id)
+        for pk, project_id, user_id in Section.objects.filter(pk__in={task.section_id for task in tasks}).values_list('pk', 'project_id', 'project__user_id')
+    }
+
+    for task in tasks:
+        # A missing section is left for the foreign key to reject.
+        task.project_id, task.user_id = owners.get(task.section_id, (None, None))
+
+class TaskQuerySet(TrackedQuerySet):
+    """Fills in the project and user of tasks written in bulk, unless given."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        copy_owners([task for task in objs if task.project_id is None])
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'section' in fields and 'project' not in fields:
+            objs = list(objs)
+            copy_owners(objs)
+            fields = [*fields, 'project', 'user']
+
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+class Task(TrackedModel):
+    section = models.ForeignKey(Section, on_delete=models.CASCADE)
+    # Copied from the section, so a project's or a user's tasks can be listed
+    # in due date order straight off an index. The indexes below lead with
+    # these, which also covers the lookups a plain foreign key index would.
+    # Tasks are deleted along with their section, so these don't cascade.
+    project = models.ForeignKey(Project, on_delete=models.DO_NOTHING, editable=False, db_index=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, editable=False, db_index=False)
+    name = models.CharField(_('name'), max_length=200)
+    description = models.TextField(_('description'), blank=True)
+    due_at = models.DateTimeField(_('due date'), null=True, blank=True)
+    recurrence = models.IntegerField(_('recurring frequency'), choices=RecurringFrequency.choices, default=RecurringFrequency.NEVER)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('task')
+        verbose_name_plural = _('tasks')
+        db_table = 'core_task'
+
+        indexes = [
+            models.Index(fields=['due_at']),
+            models.Index(fields=['project', 'due_at', 'id']),
+            models.Index(fields=['user', 'due_at', 'id']),
+        ]
+
+        constraints = [
+            models.UniqueConstraint(fields=('section', 'name'), name='unique_task_name'),
+            models.CheckConstraint(
+                condition=models.Q(recurrence=RecurringFrequency.NEVER) | models.Q(due_at__isnull=False),
+                name='task_recurrence_requires_due_date',
+                violation_error_message=_('If the task is recurring, a due date must be set.'),
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        task._loaded_section_id = task.__dict__.get('section_id')
+        return task
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+
+        if self.section_id != getattr(self, '_loaded_section_id', None) and (update_fields is None or 'section' in update_fields):
+            copy_owners([self])
+
+            if update_fields is not None:
+                kwargs['update_fields'] = [*update_fields, 'project', 'user']
+
+        super().save(*args, **kwargs)
+        self._loaded_section_id = self.section_id
+
+class ChangeSequence(models.Model):
+    """
+    The last sequence number handed out for a user's changes.
+
+    Incrementing it locks the row until the transaction commits, so changes
+    become visible in sequence order and a client syncing from the highest
+    number it has seen never skips one.
+    """
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'core_change_sequence'
+
+class ChangeKind(models.TextChoices):
+    PROJECT = 'project', _('Project')
+    SECTION = 'section', _('Section')
+    TASK = 'task', _('Task')
+
+class Change(models.Model):
+    """
+    The latest change to a project, section or task. Each object keeps a single
+    row whose `seq` moves forward with every edit, and a deleted object's row
+    stays behind as its tombstone.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    seq = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=16, choices=ChangeKind.choices)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'core_change'
+
+        indexes = [
+            models.Index(fields=['user', 'seq']),
+        ]
+
+        constraints = [
+            models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_change_object'),
+        ]
+
+class OutgoingEmail(models.Model):
+    """
+    An email waiting in the outbox for `send_outbox` to deliver it.
+
+    Rows are deleted once sent. `next_attempt_at` is cleared when the last
+    attempt fails, so undeliverable mail stays visible in the admin.
+    """
+
+    subject = models.TextField(_('subject'), blank=True)
+    body = models.TextField(_('body'), blank=True)
+    content_subtype = models.CharField(max_length=32, default='plain')
+    from_email = models.TextField(_('from'))
+    to = models.JSONField(_('to'), default=list)
+    cc = models.JSONField(default=list)
+    bcc = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list)
+    headers = models.JSONField(default=dict)
+    alternatives = models.JSONField(default=list)
+    attachments = models.JSONField(default=list)
+    attempts = models.PositiveSmallIntegerField(_('attempts'), default=0)
+    next_attempt_at = models.DateTimeField(_('next attempt at'), null=True)
+    last_error = models.TextField(_('last error'), blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        db_table = 'core_outgoing_email'
+        verbose_name = _('Outgoing Email')
+        verbose_name_plural = _('Outgoing Emails')
+
+        indexes = [
+            models.Index(fields=['next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+    @classmethod
+    def from_message(cls, message, next_attempt_at):
+        attachments = []
+
+        for attachment in message.attachments:
+            if isinstance(attachment, MIMEBase):
+                raise TypeError('MIMEBase attachments cannot be queued; attach the file contents instead.')
+
+            filename, content, mimetype = attachment
+
+            if isinstance(content, str):
+                content = content.encode('utf-8')
+
+            attachments.append([filename, base64.b64encode(content).decode('ascii'), mimetype])
+
+        return cls(
+            subject=message.subject,
+            body=message.body,
+            content_subtype=message.content_subtype,
+            from_email=message.from_email,
+            to=message.to,
+            cc=message.cc,
+            bcc=message.bcc,
+            reply_to=message.reply_to,
+            headers=message.extra_headers,
+            alternatives=[list(alternative) for alternative in getattr(message, 'alternatives', [])],
+            attachments=attachments,
+            next_attempt_at=next_attempt_at,
+        )
+
+    def to_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+            cc=self.cc,
+            bcc=self.bcc,
+            reply_to=self.reply_to,
+            headers=self.headers,
+            alternatives=[tuple(alternative) for alternative in self.alternatives],
+            connection=connection,
+        )
+        message.content_subtype = self.content_subtype
+
+        for filename, content, mimetype in self.attachments:
+            message.attach(filename, base64.b64decode(content), mimetype)
+
+        return message
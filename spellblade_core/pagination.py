@@ -0,0 +1,122 @@
+import base64
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Pages through a queryset by the values of `ordering` on the last row of the
+    previous page rather than by offset, so with a matching index every page
+    costs the same as the first.
+
+    `ordering` must end in a unique field. Fields are ascending, with nulls
+    sorted last. Cursors are opaque to clients.
+    """
+
+    ordering = ('id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [queryset.model._meta.get_field(name) for name in self.ordering]
+
+        queryset = queryset.order_by(*(
+            F(field.attname).asc(nulls_last=True) if field.null else F(field.attname).asc()
+            for field in self.fields
+        ))
+
+        cursor = self.decode_cursor(request)
+
+        if cursor is not None:
+            queryset = queryset.filter(self.get_after_filter(cursor))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.LIST_PAGE_SIZE
+
+        return max(1, min(page_size, settings.LIST_MAX_PAGE_SIZE))
+
+    def get_after_filter(self, cursor):
+        """
+        Builds `(a, b, ...) > cursor` as an OR of prefix equalities, where nulls
+        sort after every value.
+        """
+        condition = Q()
+        equal = Q()
+
+        for field, value in zip(self.fields, cursor):
+            if value is None:
+                equal &= Q(**{f'{field.attname}__isnull': True})
+                continue
+
+            after = Q(**{f'{field.attname}__gt': value})
+
+            if field.null:
+                after |= Q(**{f'{field.attname}__isnull': True})
+
+            condition |= equal & after
+            equal &= Q(**{field.attname: value})
+
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+
+        if encoded is None:
+            return None
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+
+            return [None if value is None else field.to_python(value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row):
+        values = [getattr(row, field.attname) for field in self.fields]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+class NameKeysetPagination(KeysetPagination):
+    ordering = ('name', 'id')
+
+class DueDateKeysetPagination(KeysetPagination):
+    ordering = ('due_at', 'id')
@@ -0,0 +1,67 @@
+"""Expands tasks into their occurrences over a window of time."""
+import heapq
+from collections import namedtuple
+from datetime import timedelta
+from itertools import dropwhile
+from operator import attrgetter
+from django.db.models import Q
+from .models import RecurringFrequency, Task
+
+PERIODS = {
+    RecurringFrequency.EVERY_DAY: timedelta(days=1),
+    RecurringFrequency.EVERY_WEEK: timedelta(weeks=1),
+}
+
+Occurrence = namedtuple('Occurrence', ('task_id', 'section_id', 'name', 'at'))
+
+def iter_task_occurrences(task, start, end):
+    """
+    Yields the occurrences of `task` in `[start, end)`, spaced a whole number of
+    periods from its due date in UTC.
+    """
+    due_at = task['due_at']
+    period = PERIODS.get(task['recurrence'])
+
+    if period is None:
+        if start <= due_at < end:
+            yield Occurrence(task['id'], task['section_id'], task['name'], due_at)
+        return
+
+    # Jump straight to the first occurrence in the window, so a task that has
+    # recurred for years costs no more than one created yesterday.
+    at = due_at + max(0, -((due_at - start) // period)) * period
+
+    while at < end:
+        yield Occurrence(task['id'], task['section_id'], task['name'], at)
+        at += period
+
+def expand_occurrences(tasks, start, end):
+    """
+    Lazily merges the occurrences of `tasks` into one stream, ordered by time
+    and then by task ID.
+    """
+    return heapq.merge(*(iter_task_occurrences(task, start, end) for task in tasks), key=attrgetter('at', 'task_id'))
+
+def get_occurrences(user, start, end, after=None):
+    """
+    Returns the occurrences of the user's tasks in `[start, end)`, fetching the
+    tasks in a single query on the `due_at` index. `after` is the `(at,
+    task_id)` of an occurrence already returned, to resume right after it.
+    """
+    if after is not None:
+        start = max(start, after[0])
+
+    tasks = (
+        Task.objects
+        .filter(section__project__user=user, due_at__lt=end)
+        .filter(Q(due_at__gte=start) | ~Q(recurrence=RecurringFrequency.NEVER))
+        .values('id', 'section_id', 'name', 'due_at', 'recurrence')
+    )
+
+    occurrences = expand_occurrences(tasks, start, end)
+
+    if after is not None:
+        # Occurrences at the same instant as the last one are told apart by task.
+        occurrences = dropwhile(lambda occurrence: (occurrence.at, occurrence.task_id) <= after, occurrences)
+
+    return occurrences
@@ -0,0 +1,67 @@
+"""
+Full-text search over task names and descriptions.
+
+On PostgreSQL this matches against a GIN index on a weighted tsvector, so the
+expression below has to stay identical to the one indexed in migration 0006.
+SQLite, used for local testing, searches an FTS5 table kept in sync by
+triggers. Other databases fall back to a substring match.
+"""
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from .models import Task
+
+SEARCH_VECTOR = (
+    "(setweight(to_tsvector('english', \"core_task\".\"name\"), 'A') || "
+    "setweight(to_tsvector('english', \"core_task\".\"description\"), 'B'))"
+)
+SEARCH_QUERY = "websearch_to_tsquery('english', %s)"
+
+def quote_fts5(query):
+    """Turns free text into an FTS5 query matching every word, ignoring its syntax."""
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in query.split())
+
+def search_tasks(user, query):
+    """Returns the user's tasks matching `query`, best match first."""
+    tasks = Task.objects.filter(section__project__user=user)
+
+    if connection.vendor == 'postgresql':
+        return (
+            tasks
+            .alias(matches=RawSQL(f'{SEARCH_VECTOR} @@ {SEARCH_QUERY}', (query,), output_field=BooleanField()))
+            .filter(matches=True)
+            .annotate(rank=RawSQL(f'ts_rank({SEARCH_VECTOR}, {SEARCH_QUERY})', (query,), output_field=FloatField()))
+            .order_by('-rank', 'id')
+        )
+
+    if connection.vendor == 'sqlite':
+        query = quote_fts5(query)
+
+        if not query:
+            return tasks.none()
+
+        # bm25() is lower for better matches; names weigh ten times as much as
+        # descriptions, like the A and B weights on PostgreSQL.
+        return (
+            tasks
+            .filter(id__in=RawSQL('SELECT rowid FROM core_task_fts WHERE core_task_fts MATCH %s', (query,)))
+            .annotate(rank=RawSQL(
+                'SELECT -bm25(core_task_fts, 10.0, 1.0) FROM core_task_fts '
+                'WHERE core_task_fts MATCH %s AND core_task_fts.rowid = "core_task"."id"',
+                (query,),
+                output_field=FloatField(),
+            ))
+            .order_by('-rank', 'id')
+        )
+
+    words = query.split()
+
+    if not words:
+        return tasks.none()
+
+    condition = Q()
+
+    for word in words:
+        condition &= Q(name__icontains=word) | Q(description__icontains=word)
+
+    return tasks.filter(condition).order_by('name', 'id')
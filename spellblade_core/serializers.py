@@ -1 +1,99 @@
+import base64
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from .models import Project, RecurringFrequency, Section, Task
+
+class ProjectSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ('id', 'name')
+
+class SectionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Section
+        fields = ('id', 'project', 'name')
+
+class TaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ('id', 'section', 'name', 'description', 'due_at', 'recurrence')
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=settings.LIST_MAX_PAGE_SIZE, default=settings.LIST_PAGE_SIZE)
+
+class OccurrenceQuerySerializer(serializers.Serializer):
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=settings.OCCURRENCES_MAX_RESULTS, default=settings.OCCURRENCES_MAX_RESULTS)
+    cursor = serializers.CharField(required=False)
+
+    @staticmethod
+    def encode_cursor(occurrence):
+        values = [occurrence.at.isoformat(), occurrence.task_id]
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+    def validate_cursor(self, value):
+        """Decodes the cursor into the `(at, task_id)` of the last occurrence returned."""
+        try:
+            at, task_id = json.loads(base64.urlsafe_b64decode(value.encode('ascii')))
+            at = parse_datetime(at)
+
+            if at is None or timezone.is_naive(at) or not isinstance(task_id, int):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(_('Invalid cursor'))
+
+        return at, task_id
+
+    def validate(self, attrs):
+        attrs.setdefault('start', timezone.now())
+        attrs.setdefault('end', attrs['start'] + timedelta(days=settings.OCCURRENCES_DEFAULT_DAYS))
+
+        if attrs['end'] <= attrs['start']:
+            raise serializers.ValidationError(_('The end of the window must be after its start.'))
+
+        if attrs['end'] - attrs['start'] > timedelta(days=settings.OCCURRENCES_MAX_DAYS):
+            raise serializers.ValidationError(_('The window can span at most %(days)d days.') % {'days': settings.OCCURRENCES_MAX_DAYS})
+
+        return attrs
+
+class SyncQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=settings.SYNC_MAX_PAGE_SIZE, default=settings.SYNC_MAX_PAGE_SIZE)
+
+class TaskOperationSerializer(serializers.Serializer):
+    FIELDS = {
+        'create': ({'section', 'name'}, {'section', 'name', 'description', 'due_at', 'recurrence'}),
+        'update': ({'id'}, {'id', 'section', 'name', 'description', 'due_at', 'recurrence'}),
+        'move': ({'id', 'section'}, {'id', 'section'}),
+        'delete': ({'id'}, {'id'}),
+    }
+
+    op = serializers.ChoiceField(choices=tuple(FIELDS))
+    id = serializers.IntegerField(required=False)
+    section = serializers.IntegerField(required=False)
+    name = serializers.CharField(required=False, max_length=Task._meta.get_field('name').max_length)
+    description = serializers.CharField(required=False, allow_blank=True)
+    due_at = serializers.DateTimeField(required=False, allow_null=True)
+    recurrence = serializers.ChoiceField(required=False, choices=RecurringFrequency.choices)
+
+    def validate(self, attrs):
+        required, allowed = self.FIELDS[attrs['op']]
+        fields = attrs.keys() - {'op'}
+
+        errors = {field: [_('This field is required.')] for field in required - fields}
+        errors.update({field: [_('This field is not allowed for this operation.')] for field in fields - allowed})
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+class BulkTaskSerializer(serializers.Serializer):
+    operations = TaskOperationSerializer(many=True, allow_empty=False, max_length=settings.BULK_MAX_OPERATIONS)
@@ -0,0 +1,130 @@
+"""Records changes to a user's workspace so clients can sync only what changed."""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .models import Change, ChangeKind, ChangeSequence, Project, Section, Task
+
+KINDS = {
+    Project: ChangeKind.PROJECT,
+    Section: ChangeKind.SECTION,
+    Task: ChangeKind.TASK,
+}
+
+# How each kind's rows lead to their owner, and to the rows a delete cascades to.
+OWNERS = {
+    Project: 'user_id',
+    Section: 'project__user_id',
+    Task: 'user_id',
+}
+
+CHILDREN = {
+    Project: (Section, 'project__in'),
+    Section: (Task, 'section__in'),
+}
+
+deferred_changes = ContextVar('deferred_changes', default=None)
+
+def allocate_seq(user_id, count=1):
+    """
+    Reserves `count` sequence numbers for the user and returns the first. Must
+    be called in a transaction, which holds the user's sequence until commit.
+    """
+    if not ChangeSequence.objects.filter(user_id=user_id).update(value=F('value') + count):
+        try:
+            with transaction.atomic():
+                ChangeSequence.objects.create(user_id=user_id, value=count)
+        except IntegrityError:
+            # Another transaction created it first; queue up behind it.
+            ChangeSequence.objects.filter(user_id=user_id).update(value=F('value') + count)
+
+    return ChangeSequence.objects.values_list('value', flat=True).get(user_id=user_id) - count + 1
+
+def record_changes(user_id, changes):
+    """
+    Records `(kind, object_id, deleted)` changes for the user in one upsert,
+    numbered in the order given. Inside `defer_changes` they're added to the
+    pending batch instead.
+    """
+    if not changes:
+        return
+
+    deferred = deferred_changes.get()
+
+    if deferred is not None:
+        deferred.extend(changes)
+        return
+
+    with transaction.atomic(savepoint=False):
+        seq = allocate_seq(user_id, len(changes))
+
+        Change.objects.bulk_create(
+            [
+                Change(user_id=user_id, seq=seq + offset, kind=kind, object_id=object_id, deleted=deleted)
+                for offset, (kind, object_id, deleted) in enumerate(changes)
+            ],
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['seq', 'deleted'],
+        )
+
+def get_user_id(instance):
+    """Looks up who owns a saved project, section or task, with one query at most."""
+    if isinstance(instance, Project):
+        return instance.user_id
+
+    return type(instance)._base_manager.filter(pk=instance.pk).values_list(OWNERS[type(instance)], flat=True).get()
+
+def record_save(instance):
+    change = (KINDS[type(instance)], instance.pk, False)
+    deferred = deferred_changes.get()
+
+    # A deferred batch already knows whose changes it holds.
+    if deferred is not None:
+        deferred.append(change)
+    else:
+        record_changes(get_user_id(instance), [change])
+
+def collect_deletes(queryset):
+    """
+    Returns the tombstones for deleting `queryset`, including the rows it
+    cascades to, grouped by user. Each level is fetched with one query and
+    locked, so rows can't be added under it before the delete.
+    """
+    changes = defaultdict(list)
+    model = queryset.model
+    rows = queryset.select_for_update(of=('self',)).values_list('pk', OWNERS[model])
+
+    while True:
+        pks = []
+
+        for pk, user_id in rows:
+            changes[user_id].append((KINDS[model], pk, True))
+            pks.append(pk)
+
+        if not pks or model not in CHILDREN:
+            return changes
+
+        model, lookup = CHILDREN[model]
+        rows = model._base_manager.filter(**{lookup: pks}).select_for_update(of=('self',)).values_list('pk', OWNERS[model])
+
+def record_deletes(changes):
+    for user_id, user_changes in changes.items():
+        record_changes(user_id, user_changes)
+
+@contextmanager
+def defer_changes(user_id):
+    """
+    Collects the changes recorded inside the block, and any added to the
+    yielded list, into a single `record_changes` call on the way out.
+    """
+    changes = []
+    token = deferred_changes.set(changes)
+
+    try:
+        yield changes
+    finally:
+        deferred_changes.reset(token)
+
+    record_changes(user_id, changes)
@@ -1,3 +1,528 @@
-from rest_framework.test import APITestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+import json
+import logging
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
 from rest_framework.reverse import reverse
 from rest_framework import status
+from spellblade.log import BackgroundAdminEmailHandler
+from spellblade_auth.models import OutstandingToken, User
+from spellblade_auth.tokens import RefreshToken
+from .models import Change, OutgoingEmail, Project, RecurringFrequency, Section, Task
+from .recurrence import expand_occurrences
+
+@override_settings(
+    EMAIL_BACKEND='spellblade_core.mail.OutboxEmailBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class OutboxTests(APITransactionTestCase):
+    databases = '__all__'
+
+    def test_queues_with_transaction(self):
+        with transaction.atomic():
+            mail.send_mail('Kept', 'Body', None, ['wizard@example.com'])
+
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            mail.send_mail('Rolled back', 'Body', None, ['wizard@example.com'])
+            1 / 0
+
+        self.assertEqual(list(OutgoingEmail.objects.values_list('subject', flat=True)), ['Kept'])
+        self.assertEqual(mail.outbox, [])
+
+    def test_sends_queued_email(self):
+        message = mail.EmailMultiAlternatives('Welcome', 'Body', None, ['wizard@example.com'], cc=['merlin@example.com'])
+        message.attach_alternative('<p>Body</p>', 'text/html')
+        message.attach('spell.txt', 'Abracadabra', 'text/plain')
+        message.send()
+
+        call_command('send_outbox', once=True, stdout=StringIO())
+
+        self.assertFalse(OutgoingEmail.objects.exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Welcome')
+        self.assertEqual(mail.outbox[0].recipients(), ['wizard@example.com', 'merlin@example.com'])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(mail.outbox[0].attachments[0][:2], ('spell.txt', 'Abracadabra'))
+
+    @override_settings(ADMINS=[('Merlin', 'merlin@example.com')])
+    def test_mails_errors_directly(self):
+        handler = next(handler for handler in logging.getLogger('django').handlers if isinstance(handler, BackgroundAdminEmailHandler))
+
+        with mock.patch.object(handler, 'email_backend', 'django.core.mail.backends.locmem.EmailBackend'):
+            logging.getLogger('django.request').error('Internal Server Error')
+            handler.flush()
+
+        self.assertFalse(OutgoingEmail.objects.exists())
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_retries_with_backoff(self):
+        mail.send_mail('Welcome', 'Body', None, ['wizard@example.com'])
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('refused')):
+            call_command('send_outbox', once=True, stdout=StringIO())
+
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('refused', email.last_error)
+
+        with override_settings(OUTBOX_MAX_ATTEMPTS=2):
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+
+            with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('refused')):
+                call_command('send_outbox', once=True, stdout=StringIO())
+
+        self.assertIsNone(OutgoingEmail.objects.get().next_attempt_at)
+        self.assertEqual(mail.outbox, [])
+
+class TreeTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.client.force_authenticate(self.user)
+
+        other = User.objects.create_user(username='merlin', email='merlin@example.com', password='correct horse')
+        Section.objects.create(project=Project.objects.create(user=other, name='Hidden'), name='Hidden')
+
+    def create_workspace(self, size):
+        for i in range(size):
+            project = Project.objects.create(user=self.user, name=f'Project {size}.{i}')
+
+            for j in range(size):
+                section = Section.objects.create(project=project, name=f'Section {j}')
+                Task.objects.bulk_create(Task(section=section, name=f'Task {k}') for k in range(size))
+
+    def test_tree(self):
+        project = Project.objects.create(user=self.user, name='Spells')
+        section = Section.objects.create(project=project, name='Fire')
+        Task.objects.create(section=section, name='Fireball', due_at=timezone.now(), recurrence=RecurringFrequency.EVERY_DAY)
+
+        response = self.client.get(reverse('tree'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['projects']), 1)
+        self.assertEqual(response.json()['projects'][0]['sections'][0]['tasks'][0]['name'], 'Fireball')
+
+    def test_queries_do_not_grow_with_workspace(self):
+        self.create_workspace(1)
+
+        with self.assertNumQueries(4):
+            self.client.get(reverse('tree'))
+
+        self.create_workspace(4)
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('tree'))
+
+        self.assertEqual(len(response.json()['projects']), 5)
+
+    def test_conditional_get(self):
+        self.create_workspace(2)
+        etag = self.client.get(reverse('tree'))['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tree'), headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        task = Task.objects.filter(name='Task 0').first()
+        task.description = 'Changed'
+        task.save()
+        response = self.client.get(reverse('tree'), headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+class OccurrenceTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.client.force_authenticate(self.user)
+        self.section = Section.objects.create(project=Project.objects.create(user=self.user, name='Spells'), name='Fire')
+
+    def test_expand_occurrences(self):
+        start = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+        tasks = [
+            {'id': 1, 'section_id': 1, 'name': 'Daily', 'due_at': start - timedelta(days=1000, hours=2), 'recurrence': RecurringFrequency.EVERY_DAY},
+            {'id': 2, 'section_id': 1, 'name': 'Weekly', 'due_at': start + timedelta(days=1), 'recurrence': RecurringFrequency.EVERY_WEEK},
+            {'id': 3, 'section_id': 1, 'name': 'Once', 'due_at': start + timedelta(hours=1), 'recurrence': RecurringFrequency.NEVER},
+        ]
+
+        occurrences = list(expand_occurrences(tasks, start, start + timedelta(days=9)))
+
+        self.assertEqual([occurrence.name for occurrence in occurrences[:4]], ['Once', 'Daily', 'Weekly', 'Daily'])
+        self.assertEqual(occurrences[1].at, start + timedelta(hours=22))
+        self.assertEqual(sum(occurrence.name == 'Daily' for occurrence in occurrences), 9)
+        self.assertEqual(sum(occurrence.name == 'Weekly' for occurrence in occurrences), 2)
+
+    def test_endpoint_uses_one_query(self):
+        now = timezone.now()
+
+        for i in range(10):
+            Task.objects.create(section=self.section, name=f'Daily {i}', due_at=now - timedelta(days=i), recurrence=RecurringFrequency.EVERY_DAY)
+
+        Task.objects.create(section=self.section, name='Past', due_at=now - timedelta(days=1))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('occurrences'), {'start': now.isoformat(), 'end': (now + timedelta(days=90)).isoformat()})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['occurrences']), 900)
+        self.assertFalse(response.data['truncated'])
+
+    def test_endpoint_truncates(self):
+        Task.objects.create(section=self.section, name='Daily', due_at=timezone.now(), recurrence=RecurringFrequency.EVERY_DAY)
+
+        response = self.client.get(reverse('occurrences'), {'limit': 5})
+
+        self.assertEqual(len(response.data['occurrences']), 5)
+        self.assertTrue(response.data['truncated'])
+
+    def test_endpoint_pages_through_ties(self):
+        now = timezone.now()
+        params = {'start': now.isoformat(), 'end': (now + timedelta(days=3)).isoformat(), 'limit': 2}
+
+        for i in range(3):
+            Task.objects.create(section=self.section, name=f'Daily {i}', due_at=now, recurrence=RecurringFrequency.EVERY_DAY)
+
+        seen = []
+        response = self.client.get(reverse('occurrences'), params)
+
+        while True:
+            seen += [(occurrence['at'], occurrence['task']) for occurrence in response.data['occurrences']]
+
+            if not response.data['truncated']:
+                break
+
+            response = self.client.get(reverse('occurrences'), {**params, 'cursor': response.data['cursor']})
+
+        self.assertEqual(len(seen), 9)
+        self.assertEqual(seen, sorted(set(seen)))
+
+    def test_endpoint_rejects_invalid_cursor(self):
+        response = self.client.get(reverse('occurrences'), {'cursor': 'spell'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_endpoint_rejects_long_window(self):
+        now = timezone.now()
+
+        response = self.client.get(reverse('occurrences'), {'start': now.isoformat(), 'end': (now + timedelta(days=1000)).isoformat()})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class SyncTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.client.force_authenticate(self.user)
+
+        self.project = Project.objects.create(user=self.user, name='Spells')
+        self.section = Section.objects.create(project=self.project, name='Fire')
+        self.task = Task.objects.create(section=self.section, name='Fireball')
+
+    def sync(self, since, **params):
+        response = self.client.get(reverse('sync'), {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_full_sync(self):
+        with self.assertNumQueries(4):
+            data = self.sync(0)
+
+        self.assertEqual(data['seq'], 3)
+        self.assertFalse(data['more'])
+        self.assertEqual([project['name'] for project in data['projects']], ['Spells'])
+        self.assertEqual([section['name'] for section in data['sections']], ['Fire'])
+        self.assertEqual([task['name'] for task in data['tasks']], ['Fireball'])
+
+    def test_returns_only_changes(self):
+        self.task.name = 'Inferno'
+        self.task.save()
+
+        data = self.sync(3)
+
+        self.assertEqual(data['seq'], 4)
+        self.assertEqual(data['projects'], [])
+        self.assertEqual([task['name'] for task in data['tasks']], ['Inferno'])
+        self.assertEqual(self.sync(4)['tasks'], [])
+
+    def test_tombstones(self):
+        deleted = {'projects': [self.project.pk], 'sections': [self.section.pk], 'tasks': [self.task.pk]}
+        self.project.delete()
+
+        data = self.sync(3)
+
+        self.assertEqual(data['deleted'], deleted)
+        self.assertEqual(data['tasks'], [])
+
+    def test_cascaded_delete_queries_do_not_grow(self):
+        with self.assertNumQueries(10):
+            self.project.delete()
+
+        project = Project.objects.create(user=self.user, name='Potions')
+        section = Section.objects.create(project=project, name='Brews')
+        Task.objects.bulk_create(Task(section=section, name=f'Task {i}') for i in range(20))
+
+        with self.assertNumQueries(10):
+            project.delete()
+
+        self.assertEqual(Change.objects.filter(kind='task', deleted=True).count(), 21)
+
+    def test_change_commits_with_write(self):
+        self.task.name = 'Inferno'
+
+        with mock.patch('spellblade_core.sync.record_changes', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.task.save()
+
+        self.assertEqual(Task.objects.get(pk=self.task.pk).name, 'Fireball')
+
+    def test_pages(self):
+        data = self.sync(0, limit=2)
+
+        self.assertEqual(data['seq'], 2)
+        self.assertTrue(data['more'])
+        self.assertEqual(data['tasks'], [])
+
+        data = self.sync(data['seq'], limit=2)
+
+        self.assertEqual(data['seq'], 3)
+        self.assertFalse(data['more'])
+
+    def test_deleting_user_drops_history(self):
+        self.user.delete()
+
+        self.assertFalse(Change.objects.exists())
+
+class BulkTaskTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.client.force_authenticate(self.user)
+
+        project = Project.objects.create(user=self.user, name='Spells')
+        self.fire = Section.objects.create(project=project, name='Fire')
+        self.ice = Section.objects.create(project=project, name='Ice')
+        self.tasks = Task.objects.bulk_create(Task(section=self.fire, name=f'Task {i}') for i in range(20))
+
+    def post(self, operations):
+        return self.client.post(reverse('tasks_bulk'), {'operations': operations}, format='json')
+
+    def test_applies_batch(self):
+        operations = [{'op': 'move', 'id': task.pk, 'section': self.ice.pk} for task in self.tasks[:10]]
+        operations += [
+            {'op': 'create', 'section': self.fire.pk, 'name': 'Fireball'},
+            {'op': 'update', 'id': self.tasks[10].pk, 'description': 'Hot'},
+            {'op': 'delete', 'id': self.tasks[11].pk},
+        ]
+
+        response = self.post(operations)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][10]['status'], 'create')
+        self.assertEqual(Task.objects.filter(section=self.ice).count(), 10)
+        self.assertEqual(Task.objects.get(pk=response.data['results'][10]['id']).name, 'Fireball')
+        self.assertEqual(Task.objects.get(pk=self.tasks[10].pk).description, 'Hot')
+        self.assertFalse(Task.objects.filter(pk=self.tasks[11].pk).exists())
+        self.assertEqual(Change.objects.filter(user=self.user, kind='task', deleted=True).count(), 1)
+        self.assertEqual(Change.objects.filter(user=self.user, kind='task').count(), 13)
+
+    def test_query_count_does_not_grow(self):
+        with self.assertNumQueries(11):
+            self.post([{'op': 'move', 'id': task.pk, 'section': self.ice.pk} for task in self.tasks[:2]] + [{'op': 'delete', 'id': self.tasks[2].pk}])
+
+        with self.assertNumQueries(11):
+            self.post([{'op': 'move', 'id': task.pk, 'section': self.ice.pk} for task in self.tasks[3:19]] + [{'op': 'delete', 'id': self.tasks[19].pk}])
+
+    def test_rejects_batch_as_a_whole(self):
+        response = self.post([
+            {'op': 'update', 'id': self.tasks[0].pk, 'name': 'Renamed'},
+            {'op': 'update', 'id': self.tasks[1].pk, 'name': 'Task 2'},
+            {'op': 'create', 'section': self.fire.pk, 'name': 'Weekly', 'recurrence': RecurringFrequency.EVERY_WEEK},
+            {'op': 'move', 'id': 0, 'section': self.ice.pk},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIsNone(response.data['results'][0])
+        self.assertIn('name', response.data['results'][1]['errors'])
+        self.assertIn('due_at', response.data['results'][2]['errors'])
+        self.assertIn('id', response.data['results'][3]['errors'])
+        self.assertFalse(Task.objects.filter(name='Renamed').exists())
+
+    def test_allows_names_freed_in_same_batch(self):
+        response = self.post([
+            {'op': 'update', 'id': self.tasks[0].pk, 'name': 'Renamed'},
+            {'op': 'create', 'section': self.fire.pk, 'name': 'Task 0'},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rejects_name_swaps(self):
+        response = self.post([
+            {'op': 'update', 'id': self.tasks[0].pk, 'name': 'Task 1'},
+            {'op': 'update', 'id': self.tasks[1].pk, 'name': 'Task 2'},
+            {'op': 'update', 'id': self.tasks[2].pk, 'name': 'Task 0'},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(all('name' in result['errors'] for result in response.data['results']))
+
+    def test_rejects_malformed_operation(self):
+        response = self.post([{'op': 'move', 'id': self.tasks[0].pk}, {'op': 'delete', 'id': self.tasks[1].pk, 'name': 'x'}])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('section', response.data['results'][0]['errors'])
+        self.assertIn('name', response.data['results'][1]['errors'])
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.client.force_authenticate(self.user)
+
+        self.project = Project.objects.create(user=self.user, name='Spells')
+        section = Section.objects.create(project=self.project, name='Fire')
+        now = timezone.now()
+
+        # Pairs of tasks share a due date, and a few have none, to exercise ties and nulls.
+        Task.objects.bulk_create(
+            Task(section=section, name=f'Task {i}', due_at=None if i >= 20 else now + timedelta(days=i // 2))
+            for i in range(25)
+        )
+
+    def collect(self, url, page_size):
+        names = []
+        url += f'?page_size={page_size}'
+
+        while url:
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names.extend(task['name'] for task in response.data['results'])
+            url = response.data['next']
+
+        return names
+
+    def test_pages_by_due_date(self):
+        expected = list(Task.objects.order_by(F('due_at').asc(nulls_last=True), 'id').values_list('name', flat=True))
+
+        self.assertEqual(self.collect(reverse('project_tasks', args=[self.project.pk]), 3), expected)
+        self.assertEqual(self.collect(reverse('project_tasks', args=[self.project.pk]), 7), expected)
+
+    def test_task_listings_follow_moves(self):
+        other = Project.objects.create(user=self.user, name='Potions')
+        section = Section.objects.get()
+        section.project = other
+        section.save()
+
+        task = Task.objects.create(section=Section.objects.create(project=self.project, name='Frost'), name='Icebolt')
+
+        self.assertEqual(len(self.collect(reverse('project_tasks', args=[other.pk]), 10)), 25)
+        self.assertEqual(self.collect(reverse('project_tasks', args=[self.project.pk]), 10), ['Icebolt'])
+
+        task.section = section
+        task.save()
+
+        self.assertEqual(self.collect(reverse('project_tasks', args=[self.project.pk]), 10), [])
+        self.assertEqual(Task.objects.filter(project=other, user=self.user).count(), 26)
+
+    def test_pages_by_name(self):
+        Project.objects.bulk_create(Project(user=self.user, name=f'Project {i}') for i in range(4))
+
+        response = self.client.get(reverse('projects'), {'page_size': 3})
+        names = [project['name'] for project in response.data['results']]
+        names += [project['name'] for project in self.client.get(response.data['next']).data['results']]
+
+        self.assertEqual(names, ['Project 0', 'Project 1', 'Project 2', 'Project 3', 'Spells'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('projects'), {'cursor': 'garbage'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class TaskSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.client.force_authenticate(self.user)
+
+        section = Section.objects.create(project=Project.objects.create(user=self.user, name='Spells'), name='Fire')
+        Task.objects.create(section=section, name='Practice', description='Cast a fireball at the dummy')
+        Task.objects.create(section=section, name='Fireball', description='Learn the incantation')
+        Task.objects.create(section=section, name='Frostbolt', description='Learn the incantation')
+
+        other = User.objects.create_user(username='merlin', email='merlin@example.com', password='correct horse')
+        Task.objects.create(section=Section.objects.create(project=Project.objects.create(user=other, name='Spells'), name='Fire'), name='Fireball')
+
+    def search(self, q):
+        response = self.client.get(reverse('tasks_search'), {'q': q})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task['name'] for task in response.data['results']]
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(self.search('fireball'), ['Fireball', 'Practice'])
+
+    def test_matches_every_word(self):
+        self.assertEqual(self.search('learn frostbolt'), ['Frostbolt'])
+
+    def test_index_follows_updates_and_deletes(self):
+        Task.objects.filter(name='Frostbolt').update(name='Icebolt')
+        Task.objects.filter(name='Practice').delete()
+
+        self.assertEqual(self.search('frostbolt'), [])
+        self.assertEqual(self.search('icebolt'), ['Icebolt'])
+        self.assertEqual(self.search('fireball'), ['Fireball'])
+
+    def test_ignores_query_syntax(self):
+        self.assertEqual(self.search('"fire* OR NEAR('), [])
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='wizard', email='wizard@example.com', password='correct horse')
+        self.client.force_authenticate(self.user)
+
+        OutstandingToken.objects.create(user=self.user, token='0' * 40, expires_at=timezone.now())
+        section = Section.objects.create(project=Project.objects.create(user=self.user, name='Spells'), name='Fire')
+        Task.objects.create(section=section, name='Fireball', description='Learn the incantation')
+        Task.objects.create(section=section, name='Meteor')
+
+        other = User.objects.create_user(username='merlin', email='merlin@example.com', password='correct horse')
+        Project.objects.create(user=other, name='Potions')
+
+    def test_streams_records_in_order(self):
+        response = self.client.get(reverse('export'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual([record['type'] for record in records], ['user', 'session', 'project', 'section', 'task', 'task'])
+        self.assertEqual(records[0]['username'], 'wizard')
+        self.assertNotIn('token', records[1])
+        self.assertEqual(records[4]['description'], 'Learn the incantation')
+
+    async def test_streams_asynchronously_under_asgi(self):
+        access = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await self.async_client.get(reverse('export'), headers={'Authorization': f'Bearer {access}'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+
+        self.assertEqual([json.loads(line)['type'] for line in lines], ['user', 'session', 'project', 'section', 'task', 'task'])
+
+    def test_command_matches_endpoint(self):
+        stdout = StringIO()
+        call_command('export_user', 'wizard', stdout=stdout)
+
+        response = self.client.get(reverse('export'))
+
+        self.assertEqual(stdout.getvalue(), b''.join(response.streaming_content).decode())
@@ -1,3 +1,26 @@
 from django.urls import path
+from .views import (
+    BulkTaskView,
+    ExportView,
+    OccurrencesView,
+    ProjectListView,
+    ProjectTaskListView,
+    SectionListView,
+    SyncView,
+    TaskSearchView,
+    TreeView,
+    UpcomingTaskListView,
+)
 
-urlpatterns = []
+urlpatterns = [
+    path('tree/', TreeView.as_view(), name='tree'),
+    path('occurrences/', OccurrencesView.as_view(), name='occurrences'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('export/', ExportView.as_view(), name='export'),
+    path('tasks/bulk/', BulkTaskView.as_view(), name='tasks_bulk'),
+    path('tasks/search/', TaskSearchView.as_view(), name='tasks_search'),
+    path('tasks/upcoming/', UpcomingTaskListView.as_view(), name='tasks_upcoming'),
+    path('projects/', ProjectListView.as_view(), name='projects'),
+    path('projects/<int:pk>/sections/', SectionListView.as_view(), name='project_sections'),
+    path('projects/<int:pk>/tasks/', ProjectTaskListView.as_view(), name='project_tasks'),
+]
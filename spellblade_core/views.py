@@ -1,3 +1,265 @@
-from rest_framework.views import APIView
-from rest_framework.response import Response
+from itertools import islice
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.translation import gettext_lazy as _
 from rest_framework import status
+from rest_framework.generics import ListAPIView, get_object_or_404
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .bulk import BulkConflict, apply_task_operations, validate_task_operations
+from .export import aiter_export, iter_export
+from .models import Change, ChangeKind, ChangeSequence, Project, Section, Task
+from .pagination import DueDateKeysetPagination, NameKeysetPagination
+from .recurrence import get_occurrences
+from .search import search_tasks
+from .serializers import (
+    BulkTaskSerializer,
+    OccurrenceQuerySerializer,
+    ProjectSerializer,
+    SearchQuerySerializer,
+    SectionSerializer,
+    SyncQuerySerializer,
+    TaskSerializer,
+)
+
+SYNC_FIELDS = {
+    ChangeKind.PROJECT: (Project, ('id', 'name')),
+    ChangeKind.SECTION: (Section, ('id', 'project_id', 'name')),
+    ChangeKind.TASK: (Task, ('id', 'section_id', 'name', 'description', 'due_at', 'recurrence')),
+}
+
+class TreeView(APIView):
+    """
+    Returns the user's projects with their sections and tasks nested inside.
+
+    Each level is fetched with one flat query and nested in Python, so the
+    number of queries doesn't grow with the workspace. The ETag is the user's
+    last change number, which every write to the workspace moves forward, so
+    clients that poll with If-None-Match are answered with one query and
+    without building the tree.
+    """
+
+    renderer_classes = (JSONRenderer,)
+
+    def get(self, request):
+        # Read before the tree, so a write that lands in between only leaves
+        # the ETag behind the content, and the next request sends it again.
+        seq = ChangeSequence.objects.filter(user=request.user).values_list('value', flat=True).first() or 0
+        etag = quote_etag(f'{request.user.pk}.{seq}')
+
+        response = get_conditional_response(request, etag=etag)
+
+        if response is None:
+            content = JSONRenderer().render({'projects': self.get_projects(request.user)})
+            response = HttpResponse(content, content_type='application/json')
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_projects(self, user):
+        projects = {}
+        sections = {}
+
+        for project in Project.objects.filter(user=user).order_by('pk').values('id', 'name'):
+            projects[project['id']] = {**project, 'sections': []}
+
+        # Rows created between the queries may belong to a parent that wasn't
+        # fetched; they're left for the next request.
+        for section in Section.objects.filter(project__user=user).order_by('pk').values('id', 'project_id', 'name'):
+            if section['project_id'] in projects:
+                sections[section['id']] = {'id': section['id'], 'name': section['name'], 'tasks': []}
+                projects[section['project_id']]['sections'].append(sections[section['id']])
+
+        tasks = Task.objects.filter(section__project__user=user).order_by('pk').values(
+            'id', 'section_id', 'name', 'description', 'due_at', 'recurrence',
+        )
+
+        for task in tasks:
+            section = sections.get(task.pop('section_id'))
+
+            if section is not None:
+                section['tasks'].append(task)
+
+        return list(projects.values())
+
+class OccurrencesView(APIView):
+    """
+    Lists the occurrences of the user's tasks between `start` and `end`, which
+    default to the next `OCCURRENCES_DEFAULT_DAYS` days, in chronological
+    order and then by task. `truncated` is set when there were more than
+    `limit`; passing `cursor` back with the same window returns the next page.
+    """
+
+    def get(self, request):
+        serializer = OccurrenceQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        occurrences = list(islice(
+            get_occurrences(request.user, params['start'], params['end'], params.get('cursor')),
+            params['limit'] + 1,
+        ))
+
+        truncated = len(occurrences) > params['limit']
+        occurrences = occurrences[:params['limit']]
+
+        return Response({
+            'start': params['start'],
+            'end': params['end'],
+            'truncated': truncated,
+            'cursor': OccurrenceQuerySerializer.encode_cursor(occurrences[-1]) if truncated else None,
+            'occurrences': [
+                {'task': occurrence.task_id, 'section': occurrence.section_id, 'name': occurrence.name, 'at': occurrence.at}
+                for occurrence in occurrences
+            ],
+        })
+
+class SyncView(APIView):
+    """
+    Returns the projects, sections and tasks changed after sequence number
+    `since`, and the IDs of those deleted, at most `limit` changes at a time.
+
+    Clients store the returned `seq` and pass it as `since` on their next call,
+    repeating while `more` is set. Starting from zero fetches everything.
+    """
+
+    def get(self, request):
+        serializer = SyncQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        since = serializer.validated_data['since']
+        limit = serializer.validated_data['limit']
+
+        changes = list(
+            Change.objects
+            .filter(user=request.user, seq__gt=since)
+            .order_by('seq')
+            .values_list('seq', 'kind', 'object_id', 'deleted')[:limit + 1]
+        )
+
+        more = len(changes) > limit
+        changes = changes[:limit]
+        changed = {kind: [] for kind in ChangeKind}
+        deleted = {kind: [] for kind in ChangeKind}
+
+        for seq, kind, object_id, is_deleted in changes:
+            (deleted if is_deleted else changed)[kind].append(object_id)
+
+        data = {'seq': changes[-1][0] if changes else since, 'more': more}
+
+        for kind, (model, fields) in SYNC_FIELDS.items():
+            # An object deleted since its change was recorded is skipped here;
+            # its tombstone has a later number and arrives on a later page.
+            data[f'{kind}s'] = (
+                list(model.objects.filter(pk__in=changed[kind]).order_by('pk').values(*fields)) if changed[kind] else []
+            )
+
+        data['deleted'] = {f'{kind}s': ids for kind, ids in deleted.items()}
+        return Response(data)
+
+class BulkTaskView(APIView):
+    """
+    Creates, updates, moves and deletes tasks in one transaction.
+
+    The batch is checked as a whole before anything is written, and applies
+    entirely or not at all. `results` lines up with `operations`, giving the
+    task's ID for each one or, if the batch was rejected, its errors.
+    """
+
+    def post(self, request):
+        serializer = BulkTaskSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            # Per-operation errors come back as a list; anything else, such as
+            # a missing or oversized batch, as a single error.
+            if isinstance(serializer.errors.get('operations'), list):
+                return self.reject(serializer.errors['operations'])
+
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        operations = serializer.validated_data['operations']
+        created, updated, deleted, errors = validate_task_operations(request.user, operations)
+
+        if any(errors):
+            return self.reject(errors)
+
+        try:
+            apply_task_operations(request.user, created, updated, deleted)
+        except BulkConflict:
+            return Response({'detail': _('The tasks changed while the batch was applied. Try again.')}, status=status.HTTP_409_CONFLICT)
+
+        results = [None] * len(operations)
+
+        for index, task in created + updated:
+            results[index] = {'id': task.pk, 'status': operations[index]['op']}
+
+        for index, task in deleted:
+            results[index] = {'id': operations[index]['id'], 'status': 'delete'}
+
+        return Response({'results': results})
+
+    def reject(self, errors):
+        return Response({'results': [{'errors': error} if error else None for error in errors]}, status=status.HTTP_400_BAD_REQUEST)
+
+class ProjectListView(ListAPIView):
+    serializer_class = ProjectSerializer
+    pagination_class = NameKeysetPagination
+
+    def get_queryset(self):
+        return Project.objects.filter(user=self.request.user)
+
+class SectionListView(ListAPIView):
+    serializer_class = SectionSerializer
+    pagination_class = NameKeysetPagination
+
+    def get_queryset(self):
+        project = get_object_or_404(Project.objects.filter(user=self.request.user), pk=self.kwargs['pk'])
+        return Section.objects.filter(project=project)
+
+class ProjectTaskListView(ListAPIView):
+    serializer_class = TaskSerializer
+    pagination_class = DueDateKeysetPagination
+
+    def get_queryset(self):
+        project = get_object_or_404(Project.objects.filter(user=self.request.user), pk=self.kwargs['pk'])
+        return Task.objects.filter(project=project)
+
+class UpcomingTaskListView(ListAPIView):
+    """Lists the user's tasks due from now on, soonest first."""
+
+    serializer_class = TaskSerializer
+    pagination_class = DueDateKeysetPagination
+
+    def get_queryset(self):
+        return Task.objects.filter(user=self.request.user, due_at__gte=timezone.now())
+
+class TaskSearchView(APIView):
+    """Searches the names and descriptions of the user's tasks, best match first."""
+
+    def get(self, request):
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        tasks = search_tasks(request.user, serializer.validated_data['q'])[:serializer.validated_data['limit']]
+        return Response({'results': TaskSerializer(tasks, many=True).data})
+
+class ExportView(APIView):
+    """
+    Streams everything stored for the user as newline-delimited JSON, one
+    record per line, without building the export in memory. Under ASGI the
+    stream has to be an async iterator for that.
+    """
+
+    def get(self, request):
+        if isinstance(request._request, ASGIRequest):
+            content = aiter_export(request.user.pk)
+        else:
+            content = iter_export(request.user.pk)
+
+        response = StreamingHttpResponse(content, content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="export.ndjson"'
+        patch_cache_control(response, private=True, no_store=True)
+        return response